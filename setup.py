@@ -7,6 +7,10 @@ setup(
     install_requires=[
         "openpyxl>=3.0.0",
     ],
+    extras_require={
+        'lxml': ["lxml>=4.0.0"],
+        'numpy': ["numpy>=1.20"],
+    },
     entry_points={
         'console_scripts': [
             'excel-analyzer=src.cli:main',
@@ -9,18 +9,37 @@ Key features:
 - String length checking
 - Special character detection
 - Sheet name validation
+- Numeric and date value checks
 - Style analysis
 """
 import os
+import time
+import random
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from zipfile import ZipFile, BadZipFile
 from openpyxl.utils.exceptions import InvalidFileException
 import xml.etree.ElementTree as ET
-from typing import List, Optional
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
 
-from .models import CellError, AnalysisContext, ErrorSeverity
-from .constants import ExcelLimits, XMLNamespaces, ZERO_WIDTH_CHARS
+from .models import (CellError, AnalysisContext, AnalysisReport, ErrorSeverity, ScanCoverage, WorkbookStats,
+                     SheetStats, PartStats, SharedStringHealth)
+from .constants import ExcelLimits, XMLNamespaces
 from .utils import xml_utils, validators
+from .utils.numeric_utils import BUILTIN_DATE_FORMATS, NumericBatch, NumericColumn, is_date_format
+from .utils.report_utils import generate_report
+from .rules import (AnalysisPlan, PART_WORKBOOK, PART_SHARED_STRINGS, PART_WORKSHEETS, PART_STYLES,
+                    ELEMENT_SHEET, ELEMENT_SHARED_STRING, ELEMENT_CELL, ELEMENT_SHARED_STRING_TABLE,
+                    ELEMENT_NUMBER)
+
+# Worksheets smaller than this are scanned in-process even with ``jobs``;
+# below it the pool start-up costs more than the parallel parse saves
+ROW_RANGE_MIN_SIZE = 32 * 1024 * 1024
+# Row ranges per worker process, so uneven ranges still balance out
+ROW_RANGES_PER_JOB = 4
+# Numeric cells collected before their values are checked in bulk
+NUMERIC_BATCH_SIZE = 65536
 
 class ExcelAnalyzer:
     def __init__(self):
@@ -32,9 +51,67 @@ class ExcelAnalyzer:
         logging.basicConfig(level=logging.INFO, format='%(message)s')
         self.logger = logging.getLogger(__name__)
 
-    def analyze_file(self, file_path: str, verbose: bool = False) -> List[CellError]:
-        """Analyze Excel file and locate errors"""
+    @property
+    def coverage(self) -> Optional[ScanCoverage]:
+        """Coverage achieved by the most recent worksheet scan"""
+        return self.context.coverage
+
+    @property
+    def stats(self) -> Optional[WorkbookStats]:
+        """Workbook profile from the most recent run with ``collect_stats``"""
+        return self.context.stats
+
+    @property
+    def sst_health(self) -> Optional[SharedStringHealth]:
+        """Shared strings table health from the most recent run"""
+        return self.context.sst_health
+
+    def analyze_file(self, file_path: str, verbose: bool = False,
+                     deadline: Optional[float] = None,
+                     sample: Optional[float] = None,
+                     collect_stats: bool = False,
+                     rules: Optional[Iterable[str]] = None,
+                     skip_rules: Optional[Iterable[str]] = None,
+                     parser: Optional[str] = None,
+                     jobs: Optional[int] = None) -> List[CellError]:
+        """Analyze Excel file and locate errors
+
+        ``deadline`` is a time budget in seconds and ``sample`` the fraction
+        of worksheet rows to check. The shared strings table and workbook
+        structure are always analyzed in full; either option only limits the
+        worksheet scan, and the coverage achieved is kept in ``coverage``.
+        A sample is taken in small blocks of rows, and unsampled blocks are
+        skipped before they are parsed. With ``collect_stats`` a size/shape
+        profile is gathered during the same passes and kept in ``stats``.
+
+        ``rules`` and ``skip_rules`` select registered rules by name (see
+        ``src.rules``); only the parts the selected rules need are read.
+        ``parser`` names an XML parser backend from ``xml_utils.BACKENDS``;
+        by default the fastest installed one is used.
+
+        With ``jobs`` > 1, each worksheet larger than ``ROW_RANGE_MIN_SIZE``
+        is decompressed once into shared memory, split into row ranges and
+        parsed by that many processes. This applies to full scans only;
+        deadline and sampled scans stay sequential.
+        """
+        plan, backend = prepare_analysis(deadline, sample, collect_stats, rules, skip_rules, parser, jobs)
+        
+        started = time.monotonic()
         self.context.verbose = verbose
+        self.context.plan = plan
+        self.context.parser = backend
+        self.context.sheet_names = {}
+        self.context.deadline = started + deadline if deadline is not None else None
+        self.context.sample_rate = sample
+        self.context.jobs = jobs or 1
+        mode = "deadline" if deadline is not None else "full"
+        if sample is not None:
+            mode = "sample" if deadline is None else "deadline+sample"
+        self.context.coverage = ScanCoverage(mode=mode, sample_rate=sample)
+        self.context.stats = WorkbookStats() if collect_stats else None
+        self.context.sst_health = None
+        self.context.date_styles = frozenset()
+        self.context.date1904 = False
         self.errors = []
         
         if self.context.verbose:
@@ -53,10 +130,20 @@ class ExcelAnalyzer:
                 if self.context.verbose:
                     print("\n🔍 Checking file structure...")
                 
-                self.context.long_string_index = self._analyze_shared_strings(zf)
-                self._analyze_styles(zf)
-                self._analyze_worksheets(zf)
+                if self.context.stats is not None:
+                    self._record_part_stats(zf)
+                
+                if plan.needs(PART_WORKBOOK):
+                    self.context.sheet_names = self._analyze_workbook(zf)
+                if plan.needs(PART_SHARED_STRINGS):
+                    self.context.long_string_index = self._analyze_shared_strings(zf)
+                if plan.needs(PART_STYLES):
+                    self.context.date_styles = self._analyze_styles(zf)
+                if plan.needs(PART_WORKSHEETS):
+                    self._analyze_worksheets(zf)
+                self._check_shared_string_health()
                 self._analyze_data_validations(zf)
+                self.context.coverage.elapsed = time.monotonic() - started
                 
                 if self.context.verbose:
                     print(f"\n✅ Analysis complete. Found {len(self.errors)} issues.")
@@ -97,38 +184,37 @@ class ExcelAnalyzer:
         if 'xl/sharedStrings.xml' not in zf.namelist():
             return None
             
+        stats = self.context.stats
+        si_rules = self.context.plan.rules_for(ELEMENT_SHARED_STRING)
+        health = None
+        if self.context.plan.rules_for(ELEMENT_SHARED_STRING_TABLE):
+            health = SharedStringHealth()
+        attributes = {}
+        long_string_index = None
         try:
-            shared_strings_xml = zf.read('xl/sharedStrings.xml')
-            tree = ET.fromstring(shared_strings_xml)
-            
-            long_string_index = None
-            for i, si in enumerate(xml_utils.find_elements(tree, './/main:si')):
-                t = si.find('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}t')
-                if t is not None:
-                    text = t.text or ""
+            with zf.open('xl/sharedStrings.xml') as stream:
+                records = self.context.parser.iter_shared_string_records(stream, attributes)
+                for i, (text, full_text, formatting) in enumerate(records):
+                    if health is not None:
+                        health.add_entry(full_text, formatting)
+                    if stats is not None:
+                        stats.shared_strings += 1
+                        stats.shared_string_lengths.add(len(text or ""))
+                    if text is None:
+                        continue
                     if len(text) > ExcelLimits.MAX_STRING_LENGTH:
                         long_string_index = i
-                        self.errors.append(CellError(
-                            sheet_name="Shared strings",
-                            row=0,
-                            column="",
-                            error_type="Long string",
-                            details=f"String index {i} length ({len(text)}) exceeds Excel limit ({ExcelLimits.MAX_STRING_LENGTH})",
-                            severity=ErrorSeverity.ERROR,
-                            fix_suggestion="Split the string into multiple cells or store in external resource"
-                        ))
-                    
-                    if any(c in text for c in ZERO_WIDTH_CHARS):
-                        self.errors.append(CellError(
-                            sheet_name="Shared strings",
-                            row=0,
-                            column="",
-                            error_type="Special character",
-                            details=f"String index {i} contains zero-width character",
-                            severity=ErrorSeverity.WARNING,
-                            fix_suggestion="Remove or replace zero-width characters"
-                        ))
+                    for rule in si_rules:
+                        self.errors.extend(rule.check(text, i))
             
+            if stats is not None:
+                stats.shared_strings_declared_count = self._int_attribute(attributes, 'count')
+                stats.shared_strings_declared_unique = self._int_attribute(attributes, 'uniqueCount')
+            if health is not None:
+                health.declared_count = self._int_attribute(attributes, 'count')
+                health.declared_unique = self._int_attribute(attributes, 'uniqueCount')
+                health.finish_entries()
+                self.context.sst_health = health
             return long_string_index
         except ET.ParseError as e:
             self.errors.append(CellError(
@@ -142,124 +228,534 @@ class ExcelAnalyzer:
             ))
             return None
 
-    def _analyze_styles(self, zf: ZipFile):
-        """Analyze styles table"""
-        pass  # Implement style analysis
+    def _check_shared_string_health(self):
+        """Run the whole-table shared string rules once references are known"""
+        health = self.context.sst_health
+        if health is None:
+            return
+        coverage = self.context.coverage
+        health.finish(self.context.plan.needs(PART_WORKSHEETS) and coverage.complete)
+        for rule in self.context.plan.rules_for(ELEMENT_SHARED_STRING_TABLE):
+            self.errors.extend(rule.check(health))
+
+    def _analyze_styles(self, zf: ZipFile) -> FrozenSet[int]:
+        """Find the cell styles (cellXfs indices) whose number format shows a date"""
+        try:
+            tree = self.context.parser.fromstring(zf.read('xl/styles.xml'))
+        except Exception:
+            return frozenset()
+        
+        ns = f"{{{XMLNamespaces.MAIN}}}"
+        date_formats = set(BUILTIN_DATE_FORMATS)
+        for num_fmt in tree.iterfind(f'{ns}numFmts/{ns}numFmt'):
+            fmt_id = self._int_attribute(num_fmt, 'numFmtId')
+            if fmt_id is None:
+                continue
+            if is_date_format(num_fmt.get('formatCode', '')):
+                date_formats.add(fmt_id)
+            else:
+                # Custom formats may redefine built-in ids
+                date_formats.discard(fmt_id)
+        return frozenset(index for index, xf in enumerate(tree.iterfind(f'{ns}cellXfs/{ns}xf'))
+                         if self._int_attribute(xf, 'numFmtId') in date_formats)
+
+    def _analyze_workbook(self, zf: ZipFile) -> Dict[str, str]:
+        """Check sheet entries of workbook.xml and map sheetId to name"""
+        try:
+            tree = self.context.parser.fromstring(zf.read('xl/workbook.xml'))
+        except Exception:
+            return {}
+        
+        workbook_pr = tree.find(f'{{{XMLNamespaces.MAIN}}}workbookPr')
+        if workbook_pr is not None:
+            self.context.date1904 = workbook_pr.get('date1904', '').lower() in ('1', 'true')
+        
+        sheet_rules = self.context.plan.rules_for(ELEMENT_SHEET)
+        sheet_names = {}
+        for sheet in tree.findall('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}sheet'):
+            name = sheet.get('name')
+            if not name:
+                continue
+            sheet_names[sheet.get('sheetId')] = name
+            for rule in sheet_rules:
+                self.errors.extend(rule.check(name))
+        return sheet_names
 
     def _analyze_worksheets(self, zf: ZipFile):
-        """Analyze worksheets"""
+        """Analyze worksheets
+
+        Cell contents are streamed row by row; under a deadline the
+        smallest sheets are scanned first so the budget covers as many
+        sheets as possible, and a sampled scan only checks a reproducible
+        random subset of rows.
+        """
         sheet_files = [f for f in zf.namelist() if f.startswith('xl/worksheets/sheet')]
+        coverage = self.context.coverage
         
         if self.context.verbose:
             self.logger.info(f"Found worksheet files: {sheet_files}")
         
+        sheets = []
         for sheet_file in sheet_files:
+            # Get sheet name from workbook.xml
+            sheet_number = int(sheet_file.split('sheet')[-1].split('.')[0])
+            sheet_name = self.context.sheet_names.get(str(sheet_number))
+            sheets.append((sheet_file, sheet_number, sheet_name))
+        coverage.sheets_total = len(sheets)
+        
+        if self.context.deadline is not None:
+            sheets.sort(key=lambda sheet: zf.getinfo(sheet[0]).file_size)
+        rng = random.Random(0) if self.context.sample_rate is not None else None
+        
+        for sheet_file, sheet_number, sheet_name in sheets:
+            display_name = sheet_name or f"Sheet{sheet_number}"
+            if self._deadline_passed():
+                coverage.deadline_reached = True
+                coverage.skipped_sheets.append(display_name)
+                coverage.rows_total += self._estimate_sheet_rows(zf, sheet_file)
+                continue
+            
+            if self.context.verbose:
+                self.logger.info(f"\nAnalyzing sheet {display_name}")
+            if self._use_row_ranges(zf, sheet_file):
+                self._scan_worksheet_row_ranges(zf, sheet_file, sheet_number, display_name)
+            else:
+                self._scan_worksheet(zf, sheet_file, sheet_number, display_name, rng)
+
+    def _scan_worksheet(self, zf: ZipFile, sheet_file: str, sheet_number: int,
+                        sheet_name: str, rng: Optional[random.Random], data=None):
+        """Stream the rows of one worksheet and record the coverage achieved
+
+        ``data`` is the already decompressed worksheet, if there is one;
+        otherwise the part is streamed from the package.
+        """
+        coverage = self.context.coverage
+        sample_rate = self.context.sample_rate
+        check_cells = bool(self.context.plan.rules_for(ELEMENT_CELL))
+        numbers = NumericBatch() if self.context.plan.rules_for(ELEMENT_NUMBER) else None
+        health = self.context.sst_health
+        errors_before = len(self.errors)
+        rows_scanned = cells_checked = 0
+        finished = False
+        sheet_stats = None
+        if self.context.stats is not None:
+            declared_range = (xml_utils.read_dimension(bytes(data[:4096])) if data is not None
+                              else self._read_sheet_dimension(zf, sheet_file))
+            sheet_stats = SheetStats(name=sheet_name, declared_range=declared_range)
+            self.context.stats.sheets[sheet_name] = sheet_stats
+        
+        sampler = None
+        try:
+            with (zf.open(sheet_file) if data is None else xml_utils.SegmentReader(data)) as stream:
+                source = stream
+                if rng is not None:
+                    # Unsampled rows are dropped before they are parsed
+                    sampler = xml_utils.RowSampleReader(stream, _systematic_sample(rng, sample_rate))
+                    source = sampler
+                for row in self.context.parser.iter_rows(source):
+                    if self._deadline_passed():
+                        coverage.deadline_reached = True
+                        break
+                    rows_scanned += 1
+                    row = xml_utils.resolve_cell_references(row)
+                    if sheet_stats is not None:
+                        self._record_row_stats(row, sheet_stats)
+                    if health is not None:
+                        self._record_references(row, health)
+                    if check_cells:
+                        cells_checked += len(row.cells)
+                        for cell in row.cells:
+                            self._check_cell(cell, sheet_name)
+                    if numbers is not None:
+                        self._collect_numbers(row, numbers, sheet_name)
+                else:
+                    finished = True
+        except ET.ParseError as e:
+            # The rows after the error were never checked
+            coverage.failed_sheets.append(sheet_name)
+            self.errors.append(CellError(
+                sheet_name=f"Sheet{sheet_number}",
+                row=0,
+                column="",
+                error_type="XML parsing error",
+                details=f"Worksheet XML parsing failed: {str(e)}",
+                severity=ErrorSeverity.CRITICAL,
+                fix_suggestion="The worksheet may be corrupted. Try recreating it"
+            ))
+        if numbers is not None:
+            self._check_numbers(numbers, sheet_name)
+        rows_seen = sampler.rows_total if sampler is not None else rows_scanned
+        
+        if finished:
+            coverage.sheets_scanned += 1
+            coverage.rows_total += rows_seen
+        else:
+            coverage.rows_total += max(rows_seen, self._estimate_sheet_rows(zf, sheet_file))
+        coverage.rows_scanned += rows_scanned
+        coverage.cell_errors += len(self.errors) - errors_before
+        
+        if self.context.verbose:
+            self.logger.info(f"Checked {cells_checked} cells in {rows_scanned} of {rows_seen} rows")
+
+    @staticmethod
+    def _record_references(row: xml_utils.RowRecord, health: SharedStringHealth):
+        """Mark the shared strings used by the cells of one row"""
+        health.mark_references([cell.value for cell in row.cells if cell.type == 's'])
+
+    def _collect_numbers(self, row: xml_utils.RowRecord, batch: NumericBatch, sheet_name: str):
+        """Queue the numeric cells of one row, checking the batch once it is full
+
+        Called once the row's other cell checks are done, so its numeric
+        findings can later be placed right after theirs.
+        """
+        cells = [cell for cell in row.cells if cell.value and cell.type in ('', 'n')]
+        if cells:
+            batch.extend(cells, len(self.errors))
+        if len(batch) >= NUMERIC_BATCH_SIZE:
+            self._check_numbers(batch, sheet_name)
+
+    def _check_numbers(self, batch: NumericBatch, sheet_name: str):
+        """Run the numeric rules over a batch in bulk and empty it
+
+        The rules report per rule; their findings are put back into row
+        and cell order among the findings of the other cell checks, so the
+        result does not depend on where batches or row ranges begin.
+        """
+        if not len(batch):
+            return
+        column = NumericColumn(batch, self.context.date_styles, self.context.date1904)
+        positions = batch.positions
+        batch.clear()
+        found = []
+        for rule in self.context.plan.rules_for(ELEMENT_NUMBER):
+            found.extend(rule.check(column, sheet_name))
+        if not found:
+            return
+        
+        cell_index = {xml_utils.parse_cell_reference(ref): i for i, ref in enumerate(column.refs)}
+        # A stable sort keeps the rule order among findings on one cell
+        found = sorted(((cell_index[error.column, error.row], error) for error in found),
+                       key=lambda item: item[0])
+        start = positions[found[0][0]]
+        following = self.errors[start:]
+        merged = []
+        taken = 0
+        for i, error in found:
+            while start + taken < positions[i]:
+                merged.append(following[taken])
+                taken += 1
+            merged.append(error)
+        merged.extend(following[taken:])
+        self.errors[start:] = merged
+
+    def _use_row_ranges(self, zf: ZipFile, sheet_file: str) -> bool:
+        """Whether a worksheet is scanned as parallel row ranges"""
+        size = zf.getinfo(sheet_file).file_size
+        return (self.context.jobs > 1
+                and self.context.deadline is None
+                and self.context.sample_rate is None
+                and size >= ROW_RANGE_MIN_SIZE
+                and _shared_memory_fits(size))
+
+    def _scan_worksheet_row_ranges(self, zf: ZipFile, sheet_file: str, sheet_number: int,
+                                   sheet_name: str):
+        """Scan one worksheet as row ranges parsed in a process pool
+
+        The part is decompressed once into shared memory; workers attach to
+        it by name and parse their range between copies of the worksheet's
+        head (up to <sheetData>) and tail, so only those few kilobytes and
+        the results are pickled. Errors are merged in range order, which is
+        row order, giving the same result as a sequential scan. A worksheet
+        that cannot be split is scanned sequentially from the shared copy,
+        so it is never decompressed twice.
+        """
+        size = zf.getinfo(sheet_file).file_size
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            with zf.open(sheet_file) as stream:
+                filled = 0
+                while filled < size:
+                    read = stream.readinto(memory.buf[filled:min(filled + (1 << 20), size)])
+                    if not read:
+                        break
+                    filled += read
+            data = memory.buf[:filled]
             try:
-                sheet_xml = zf.read(sheet_file)
-                tree = ET.fromstring(sheet_xml)
-                
-                # Get sheet name from workbook.xml
-                sheet_number = int(sheet_file.split('sheet')[-1].split('.')[0])
-                sheet_name = self._get_sheet_name(zf, sheet_number)
-                
-                if self.context.verbose:
-                    self.logger.info(f"\nAnalyzing sheet {sheet_name or f'Sheet{sheet_number}'}")
-                
-                if sheet_name:
-                    self._check_sheet_name(sheet_name, sheet_number)
-                
-                # Analyze cells
-                cells = xml_utils.find_elements(tree, './/main:c')
-                if self.context.verbose:
-                    self.logger.info(f"Found {len(cells)} cells to analyze")
-                
-                for cell in cells:
-                    cell_ref = cell.get('r', '')
-                    cell_type = cell.get('t', '')
-                    
-                    if self.context.verbose:
-                        self.logger.info(f"\nAnalyzing cell {cell_ref} (type: {cell_type})")
-                        self.logger.info(f"Cell XML: {ET.tostring(cell, encoding='unicode')}")
-                    
-                    # Check all possible string values
-                    # 1. Check inline strings
-                    is_elem = cell.find('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}is')
-                    if is_elem is not None:
-                        t_elem = is_elem.find('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}t')
-                        if t_elem is not None and t_elem.text:
-                            self._check_string_content(t_elem.text, cell_ref, sheet_name or f"Sheet{sheet_number}")
-                    
-                    # 2. Check direct string values
-                    value_elem = cell.find('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}v')
-                    if value_elem is not None and value_elem.text:
-                        if cell_type in ('str', 's', '') or cell_type is None:
-                            self._check_string_content(value_elem.text, cell_ref, sheet_name or f"Sheet{sheet_number}")
-                
-            except ET.ParseError as e:
+                bounds = xml_utils.find_sheet_data(data)
+                if bounds is None:
+                    self._scan_worksheet(zf, sheet_file, sheet_number, sheet_name, None, data)
+                    return
+                start, end = bounds
+                head, tail = bytes(data[:start]), bytes(data[end:])
+                ranges = xml_utils.split_row_ranges(data, start, end,
+                                                    self.context.jobs * ROW_RANGES_PER_JOB)
+            finally:
+                data.release()
+            
+            collect_stats = self.context.stats is not None
+            health = self.context.sst_health
+            sst_entries = health.entries if health is not None else None
+            with ProcessPoolExecutor(max_workers=min(self.context.jobs, len(ranges))) as executor:
+                results = list(executor.map(
+                    _scan_row_range,
+                    *zip(*[(memory.name, head, tail, range_start, range_end, sheet_name,
+                            self.context.plan.rule_names, self.context.parser.name, collect_stats,
+                            sst_entries, self.context.date_styles, self.context.date1904)
+                           for range_start, range_end in ranges])
+                ))
+        finally:
+            memory.close()
+            memory.unlink()
+        
+        coverage = self.context.coverage
+        errors_before = len(self.errors)
+        sheet_stats = None
+        if collect_stats:
+            sheet_stats = SheetStats(name=sheet_name, declared_range=xml_utils.read_dimension(head[:4096]))
+            self.context.stats.sheets[sheet_name] = sheet_stats
+        rows = cells_checked = 0
+        failed = False
+        for result in results:
+            self.errors.extend(result.errors)
+            rows += result.rows
+            cells_checked += result.cells_checked
+            if sheet_stats is not None:
+                sheet_stats.merge(result.sheet_stats)
+                self.context.stats.shared_string_references += result.shared_string_references
+            if health is not None:
+                health.merge_references(*result.sst_references)
+            if result.parse_error is not None:
+                # A sequential scan stops at the first malformed row as well
                 self.errors.append(CellError(
                     sheet_name=f"Sheet{sheet_number}",
                     row=0,
                     column="",
                     error_type="XML parsing error",
-                    details=f"Worksheet XML parsing failed: {str(e)}",
+                    details=f"Worksheet XML parsing failed: {result.parse_error}",
                     severity=ErrorSeverity.CRITICAL,
                     fix_suggestion="The worksheet may be corrupted. Try recreating it"
                 ))
+                coverage.failed_sheets.append(sheet_name)
+                failed = True
+                break
+        
+        if failed:
+            coverage.rows_total += max(rows, self._estimate_sheet_rows(zf, sheet_file))
+        else:
+            coverage.sheets_scanned += 1
+            coverage.rows_total += rows
+        coverage.rows_scanned += rows
+        coverage.cell_errors += len(self.errors) - errors_before
+        
+        if self.context.verbose:
+            self.logger.info(f"Checked {cells_checked} cells in {rows} rows "
+                             f"({len(ranges)} row ranges, {self.context.jobs} jobs)")
+
+    def _check_cell(self, cell: xml_utils.CellRecord, sheet_name: str):
+        """Check the string values held by a single cell"""
+        if self.context.verbose:
+            self.logger.info(f"\nAnalyzing cell {cell.ref} (type: {cell.type})")
+            self.logger.info(f"Cell values: {cell}")
+        
+        # Check all possible string values
+        # 1. Check inline strings
+        if cell.inline_text:
+            self._check_string_content(cell.inline_text, cell.ref, sheet_name)
+        
+        # 2. Check direct string values
+        if cell.value and cell.type in ('str', 's', ''):
+            self._check_string_content(cell.value, cell.ref, sheet_name)
 
-    def _get_sheet_name(self, zf: ZipFile, sheet_number: int) -> Optional[str]:
-        """Get sheet name from workbook.xml"""
+    def _deadline_passed(self) -> bool:
+        """Whether the time budget for the worksheet scan is used up"""
+        return self.context.deadline is not None and time.monotonic() >= self.context.deadline
+
+    def _estimate_sheet_rows(self, zf: ZipFile, sheet_file: str) -> int:
+        """Estimate a worksheet's row count from its <dimension> element"""
+        ref = self._read_sheet_dimension(zf, sheet_file)
+        return xml_utils.range_row_count(ref) if ref else 0
+
+    def _read_sheet_dimension(self, zf: ZipFile, sheet_file: str) -> Optional[str]:
+        """Read the declared <dimension ref> from the head of a worksheet"""
         try:
-            workbook_xml = zf.read('xl/workbook.xml')
-            tree = ET.fromstring(workbook_xml)
-            sheets = tree.findall('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}sheet')
-            
-            for sheet in sheets:
-                if sheet.get('sheetId') == str(sheet_number):
-                    return sheet.get('name')
-            
-            return None
+            with zf.open(sheet_file) as stream:
+                return xml_utils.read_dimension(stream.read(4096))
         except Exception:
             return None
 
+    @staticmethod
+    def _int_attribute(element, attr: str) -> Optional[int]:
+        """Integer value of an attribute of an element or attribute dict"""
+        value = element.get(attr)
+        try:
+            return int(value) if value is not None else None
+        except ValueError:
+            return None
+
+    def _record_part_stats(self, zf: ZipFile):
+        """Record compressed and decompressed size of every package part"""
+        for info in zf.infolist():
+            self.context.stats.parts[info.filename] = PartStats(
+                name=info.filename,
+                compressed_size=info.compress_size,
+                uncompressed_size=info.file_size
+            )
+
+    def _record_row_stats(self, row: xml_utils.RowRecord, sheet_stats: SheetStats):
+        """Update sheet counters for one scanned row"""
+        sheet_stats.rows += 1
+        row_number = row.number or sheet_stats.max_row + 1
+        if not sheet_stats.min_row or row_number < sheet_stats.min_row:
+            sheet_stats.min_row = row_number
+        if row_number > sheet_stats.max_row:
+            sheet_stats.max_row = row_number
+        
+        counts = sheet_stats.cells_by_type
+        first_ref = last_ref = None
+        for cell in row.cells:
+            if cell.ref:
+                first_ref = first_ref or cell.ref
+                last_ref = cell.ref
+            cell_type = cell.type or 'n'
+            counts[cell_type] = counts.get(cell_type, 0) + 1
+            sheet_stats.cells += 1
+            
+            if cell_type == 's':
+                self.context.stats.shared_string_references += 1
+            if cell.has_formula:
+                sheet_stats.formulas += 1
+            if cell_type == 'inlineStr':
+                sheet_stats.string_lengths.add(len(cell.inline_text or ""))
+            elif cell_type == 'str':
+                sheet_stats.string_lengths.add(len(cell.value or ""))
+        
+        if first_ref:
+            first_col = xml_utils.column_index(first_ref.rstrip('0123456789'))
+            last_col = xml_utils.column_index(last_ref.rstrip('0123456789'))
+            if not sheet_stats.min_column or first_col < sheet_stats.min_column:
+                sheet_stats.min_column = first_col
+            if last_col > sheet_stats.max_column:
+                sheet_stats.max_column = last_col
+
     def _analyze_data_validations(self, zf: ZipFile):
         """Analyze data validations"""
         pass  # Implement data validation analysis 
 
-    def _check_sheet_name(self, name: str, sheet_number: int):
-        """Check sheet name constraints"""
-        if len(name) > ExcelLimits.MAX_SHEET_NAME_LENGTH:
-            self.errors.append(CellError(
-                sheet_name=name,
-                row=0,
-                column="",
-                error_type="Sheet name too long",
-                details=f"Sheet name length ({len(name)}) exceeds Excel limit ({ExcelLimits.MAX_SHEET_NAME_LENGTH})",
-                severity=ErrorSeverity.ERROR,
-                fix_suggestion=f"Rename the sheet to use fewer than {ExcelLimits.MAX_SHEET_NAME_LENGTH} characters"
-            )) 
-
     def _check_string_content(self, text: str, cell_ref: str, sheet_name: str):
-        """Check string content for various issues"""
-        col, row = xml_utils.parse_cell_reference(cell_ref)
-        
-        if len(text) > ExcelLimits.MAX_STRING_LENGTH:
-            self.errors.append(CellError(
-                sheet_name=sheet_name,
-                row=row,
-                column=col,
-                error_type="Long string",
-                details=f"Cell string length ({len(text)}) exceeds Excel limit ({ExcelLimits.MAX_STRING_LENGTH})",
-                severity=ErrorSeverity.ERROR,
-                fix_suggestion="Split the string into multiple cells or store in external resource"
-            ))
-        
-        if any(c in text for c in ZERO_WIDTH_CHARS):
-            self.errors.append(CellError(
-                sheet_name=sheet_name,
-                row=row,
-                column=col,
-                error_type="Special character",
-                details="Cell contains zero-width character",
-                severity=ErrorSeverity.WARNING,
-                fix_suggestion="Remove or replace zero-width characters"
-            )) 
\ No newline at end of file
+        """Run the enabled cell rules on a string value"""
+        for rule in self.context.plan.rules_for(ELEMENT_CELL):
+            self.errors.extend(rule.check(text, cell_ref, sheet_name))
+
+def prepare_analysis(deadline: Optional[float] = None, sample: Optional[float] = None,
+                     collect_stats: bool = False, rules: Optional[Iterable[str]] = None,
+                     skip_rules: Optional[Iterable[str]] = None, parser: Optional[str] = None,
+                     jobs: Optional[int] = None) -> Tuple[AnalysisPlan, xml_utils.ParserBackend]:
+    """Validate ``analyze_file`` options and resolve the plan and parser
+
+    Raises ValueError for invalid options. Long-running modes call it once
+    up front, so a typo fails at start-up rather than on every file.
+    """
+    if deadline is not None and deadline <= 0:
+        raise ValueError(f"Deadline must be positive, got {deadline}")
+    if sample is not None and not 0 < sample <= 1:
+        raise ValueError(f"Sample rate must be in (0, 1], got {sample}")
+    if jobs is not None and jobs < 1:
+        raise ValueError(f"Jobs must be at least 1, got {jobs}")
+    extra_parts = (PART_SHARED_STRINGS, PART_WORKSHEETS) if collect_stats else ()
+    return AnalysisPlan.build(rules, skip_rules, extra_parts), xml_utils.get_backend(parser)
+
+def _systematic_sample(rng: random.Random, rate: float) -> Callable[[], bool]:
+    """Keep a ``rate`` share of row blocks, evenly spread from a random phase"""
+    level = rng.random()
+    
+    def keep() -> bool:
+        nonlocal level
+        level += rate
+        if level < 1:
+            return False
+        level -= 1
+        return True
+    return keep
+
+def _shared_memory_fits(size: int) -> bool:
+    """Whether /dev/shm can hold ``size`` bytes (containers often cap it)"""
+    try:
+        info = os.statvfs('/dev/shm')
+    except (AttributeError, OSError):
+        return True
+    return info.f_bavail * info.f_frsize >= size
+
+class _RowRangeResult(NamedTuple):
+    errors: List[CellError]
+    rows: int
+    cells_checked: int
+    sheet_stats: Optional[SheetStats]
+    shared_string_references: int
+    sst_references: Optional[tuple]
+    parse_error: Optional[str]
+
+def _scan_row_range(memory_name: str, head: bytes, tail: bytes, start: int, end: int,
+                    sheet_name: str, rule_names: List[str], parser: str,
+                    collect_stats: bool, sst_entries: Optional[int] = None,
+                    date_styles: FrozenSet[int] = frozenset(), date1904: bool = False) -> _RowRangeResult:
+    """Worker: check the rows in ``[start, end)`` of a shared worksheet buffer"""
+    analyzer = ExcelAnalyzer()
+    context = analyzer.context
+    context.plan = AnalysisPlan.build(rule_names)
+    context.parser = xml_utils.get_backend(parser)
+    context.stats = WorkbookStats() if collect_stats else None
+    context.date_styles = date_styles
+    context.date1904 = date1904
+    sheet_stats = SheetStats(name=sheet_name) if collect_stats else None
+    health = None
+    if sst_entries is not None:
+        health = SharedStringHealth(entries=sst_entries)
+        health.start_references()
+    check_cells = bool(context.plan.rules_for(ELEMENT_CELL))
+    numbers = NumericBatch() if context.plan.rules_for(ELEMENT_NUMBER) else None
+    rows = cells_checked = 0
+    parse_error = None
+    
+    memory = shared_memory.SharedMemory(name=memory_name)
+    view = memory.buf[start:end]
+    stream = xml_utils.SegmentReader(head, view, tail)
+    try:
+        for row in context.parser.iter_rows(stream):
+            rows += 1
+            row = xml_utils.resolve_cell_references(row)
+            if sheet_stats is not None:
+                analyzer._record_row_stats(row, sheet_stats)
+            if health is not None:
+                analyzer._record_references(row, health)
+            if check_cells:
+                cells_checked += len(row.cells)
+                for cell in row.cells:
+                    analyzer._check_cell(cell, sheet_name)
+            if numbers is not None:
+                analyzer._collect_numbers(row, numbers, sheet_name)
+    except ET.ParseError as e:
+        parse_error = str(e)
+    finally:
+        stream.close()
+        view.release()
+        memory.close()
+    if numbers is not None:
+        analyzer._check_numbers(numbers, sheet_name)
+    
+    references = context.stats.shared_string_references if collect_stats else 0
+    sst_references = None
+    if health is not None:
+        sst_references = (bytes(health.reference_bitmap), health.references, health.invalid_references)
+    return _RowRangeResult(analyzer.errors, rows, cells_checked, sheet_stats, references,
+                           sst_references, parse_error)
+
+def analyze_to_report(file_path: str, **options) -> AnalysisReport:
+    """Analyze a file with a fresh analyzer and return its report
+
+    Module-level so it can be submitted to process pools; ``options`` are
+    passed on to ``ExcelAnalyzer.analyze_file``.
+    """
+    analyzer = ExcelAnalyzer()
+    errors = analyzer.analyze_file(file_path, **options)
+    return generate_report(os.path.basename(file_path), errors, analyzer.coverage, analyzer.stats,
+                           analyzer.sst_health)
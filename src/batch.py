@@ -0,0 +1,319 @@
+"""Distributed batch analysis through a shared work queue
+
+A batch is a SQLite database on a filesystem shared by all nodes. Any
+number of worker processes on any number of machines claim files from
+it under a time-limited lease, extend their leases with heartbeats while
+they work, and write one result file per task. A lease that is not
+renewed (crashed worker, lost node) expires and the task is handed to
+another worker, up to ``max_attempts`` times.
+
+Result files are named after the task id and written atomically, so a
+task finished twice after a lease expiry still yields a single result.
+No service other than the shared disk is required.
+
+The queue uses SQLite's rollback journal rather than WAL, because WAL
+needs shared memory and only works when all processes share one host.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .analyzer import analyze_to_report
+from .models import AnalysisReport
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    finished_at REAL,
+    total_errors INTEGER,
+    result_path TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks(state, lease_expires);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    stopped_at REAL,
+    processed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+@dataclass
+class Task:
+    id: int
+    path: str
+    attempts: int
+
+@dataclass
+class BatchProgress:
+    """Snapshot of a batch for the coordinator"""
+    counts: Dict[str, int]
+    active_workers: int
+    started_at: Optional[float]
+    done_last_minute: int
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def finished(self) -> int:
+        return self.counts.get(DONE, 0) + self.counts.get(FAILED, 0)
+
+    @property
+    def throughput(self) -> float:
+        """Files finished per minute since the batch started"""
+        if not self.started_at:
+            return 0.0
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        return self.finished / elapsed * 60
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        remaining = self.total - self.finished
+        rate = self.done_last_minute or self.throughput
+        if not remaining:
+            return 0.0
+        return remaining / rate * 60 if rate else None
+
+class WorkQueue:
+    """SQLite work queue with lease/heartbeat semantics"""
+
+    def __init__(self, path: str, lease: float = 120.0, max_attempts: int = 3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'WorkQueue':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def enqueue(self, paths: Iterable[str]) -> int:
+        """Add files to the batch; files already queued are left alone"""
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO tasks (path) VALUES (?)",
+                             ((os.path.abspath(path),) for path in paths))
+            added = conn.total_changes - before
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('started_at', ?)",
+                         (str(time.time()),))
+        return added
+
+    def register_worker(self, worker_id: str):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO workers (id, host, pid, started_at, heartbeat_at) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         (worker_id, socket.gethostname(), os.getpid(), now, now))
+
+    def retire_worker(self, worker_id: str):
+        with self._transaction() as conn:
+            conn.execute("UPDATE workers SET stopped_at = ? WHERE id = ?", (time.time(), worker_id))
+
+    def claim(self, worker_id: str, count: int = 1) -> List[Task]:
+        """Lease up to ``count`` pending or expired tasks to a worker"""
+        now = time.time()
+        with self._transaction() as conn:
+            # Tasks whose lease expired too often are given up
+            conn.execute("UPDATE tasks SET state = ?, error = 'lease expired too many times', "
+                         "finished_at = ? WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                         (FAILED, now, LEASED, now, self.max_attempts))
+            rows = conn.execute(
+                "SELECT id, path, attempts FROM tasks WHERE state = ? "
+                "OR (state = ? AND lease_expires < ?) ORDER BY id LIMIT ?",
+                (PENDING, LEASED, now, count)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                ((LEASED, worker_id, now + self.lease, row[0]) for row in rows)
+            )
+        return [Task(task_id, path, attempts + 1) for task_id, path, attempts in rows]
+
+    def heartbeat(self, worker_id: str):
+        """Extend the leases of all tasks held by a worker"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE tasks SET lease_expires = ? WHERE worker = ? AND state = ?",
+                         (now + self.lease, worker_id, LEASED))
+            conn.execute("UPDATE workers SET heartbeat_at = ? WHERE id = ?", (now, worker_id))
+
+    def complete(self, task: Task, worker_id: str, total_errors: int, result_path: str) -> bool:
+        """Mark a task done; False if the lease was lost to another worker"""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE tasks SET state = ?, finished_at = ?, total_errors = ?, result_path = ?, "
+                "error = NULL WHERE id = ? AND worker = ? AND state = ?",
+                (DONE, time.time(), total_errors, result_path, task.id, worker_id, LEASED)
+            ).rowcount
+            if updated:
+                conn.execute("UPDATE workers SET processed = processed + 1 WHERE id = ?", (worker_id,))
+        return bool(updated)
+
+    def fail(self, task: Task, worker_id: str, error: str):
+        """Record a failed attempt; the task is retried until max_attempts"""
+        state = FAILED if task.attempts >= self.max_attempts else PENDING
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET state = ?, error = ?, finished_at = ?, worker = NULL, "
+                "lease_expires = NULL WHERE id = ? AND worker = ? AND state = ?",
+                (state, error, time.time() if state == FAILED else None,
+                 task.id, worker_id, LEASED)
+            )
+
+    def has_open_tasks(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM tasks WHERE state IN (?, ?) LIMIT 1",
+                                 (PENDING, LEASED)).fetchone() is not None
+
+    def progress(self) -> BatchProgress:
+        now = time.time()
+        counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+        active = self.conn.execute("SELECT COUNT(*) FROM workers WHERE stopped_at IS NULL "
+                                   "AND heartbeat_at >= ?",
+                                   (now - 2 * self.lease,)).fetchone()[0]
+        started = self.conn.execute("SELECT value FROM meta WHERE key = 'started_at'").fetchone()
+        recent = self.conn.execute("SELECT COUNT(*) FROM tasks WHERE finished_at >= ?",
+                                   (now - 60,)).fetchone()[0]
+        return BatchProgress(counts, active, float(started[0]) if started else None, recent)
+
+    def failures(self, limit: int = 20) -> List[Tuple[str, int, str]]:
+        return self.conn.execute("SELECT path, attempts, error FROM tasks WHERE state = ? "
+                                 "ORDER BY finished_at DESC LIMIT ?", (FAILED, limit)).fetchall()
+
+def _write_result(report: AnalysisReport, task: Task, results_dir: str) -> str:
+    """Write a task's report atomically under a name derived from its id"""
+    result_path = os.path.join(results_dir, f"{task.id:08d}-{report.file_name}.json")
+    tmp_path = f"{result_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(report.to_dict(), source_path=task.path), f, indent=2)
+    os.replace(tmp_path, result_path)
+    return result_path
+
+class BatchWorker:
+    """Claims tasks from a WorkQueue and analyzes them until the batch is done"""
+
+    def __init__(self, queue_path: str, results_dir: str, worker_id: Optional[str] = None,
+                 batch_size: int = 4, lease: float = 120.0, max_attempts: int = 3,
+                 idle_wait: float = 5.0, analyze_options: Optional[dict] = None):
+        self.queue_path = queue_path
+        self.results_dir = results_dir
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.batch_size = batch_size
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.idle_wait = idle_wait
+        self.analyze_options = analyze_options or {}
+        self.processed = 0
+        self.failed = 0
+        # Tasks finished after their lease had passed to another worker
+        self.lost = 0
+        os.makedirs(results_dir, exist_ok=True)
+
+    @property
+    def attempted(self) -> int:
+        """Tasks this worker has claimed and worked on"""
+        return self.processed + self.failed + self.lost
+
+    def _heartbeat_loop(self, stop: threading.Event):
+        # The heartbeat thread uses its own connection; sqlite3 connections
+        # must not be shared between threads
+        with WorkQueue(self.queue_path, self.lease, self.max_attempts) as queue:
+            while not stop.wait(self.lease / 3):
+                queue.heartbeat(self.worker_id)
+
+    def run(self, max_tasks: Optional[int] = None):
+        """Process tasks until none are pending or leased (or ``max_tasks``)"""
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(stop,), daemon=True)
+        with WorkQueue(self.queue_path, self.lease, self.max_attempts) as queue:
+            queue.register_worker(self.worker_id)
+            heartbeat.start()
+            try:
+                while max_tasks is None or self.attempted < max_tasks:
+                    count = self.batch_size
+                    if max_tasks is not None:
+                        count = min(count, max_tasks - self.attempted)
+                    tasks = queue.claim(self.worker_id, count)
+                    if not tasks:
+                        # Others may still hold leases that can expire
+                        if not queue.has_open_tasks():
+                            break
+                        time.sleep(self.idle_wait)
+                        continue
+                    for task in tasks:
+                        self._process(queue, task)
+            finally:
+                stop.set()
+                heartbeat.join()
+                queue.retire_worker(self.worker_id)
+
+    def _process(self, queue: WorkQueue, task: Task):
+        try:
+            report = analyze_to_report(task.path, **self.analyze_options)
+            result_path = _write_result(report, task, self.results_dir)
+        except Exception as e:
+            self.failed += 1
+            queue.fail(task, self.worker_id, f"{type(e).__name__}: {e}")
+            return
+        if not queue.complete(task, self.worker_id, report.total_errors, result_path):
+            self.lost += 1
+            logger.warning(f"⚠️ {task.path}: lease lost to another worker, result not recorded")
+            return
+        self.processed += 1
+
+def collect_paths(inputs: Iterable[str], extensions: Tuple[str, ...] = ('.xlsx', '.xlsm')) -> Iterable[str]:
+    """Expand files and directories (recursively) into workbook paths"""
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in files:
+                    if name.lower().endswith(extensions) and not name.startswith('~$'):
+                        yield os.path.join(root, name)
+        else:
+            yield item
@@ -5,22 +5,69 @@ This module provides the command-line interface for the Excel Analyzer tool.
 It handles command-line arguments and outputs the analysis results.
 
 Usage:
-    excel-analyzer [-v] [--json REPORT.json] [--html REPORT.html] EXCEL_FILE
+    excel-analyzer [-v] [--json REPORT.json] [--html REPORT.html [--html-paged]]
+                   [--deadline SECONDS] [--sample FRACTION] [--stats]
+                   [--rules RULE,...] [--skip-rules RULE,...]
+                   [--parser {auto,stdlib,lxml,expat}] [--jobs N]
+                   [--db FINDINGS.db] EXCEL_FILE
+    excel-analyzer query FINDINGS.db {summary,files,runs} [filters]
+    excel-analyzer watch DIR [--json-dir DIR] [--html-dir DIR [--html-paged]] [--db FINDINGS.db]
+                   [--workers N] [--settle SECONDS] [--interval SECONDS] [--polling]
+    excel-analyzer batch enqueue QUEUE.db PATH [PATH ...]
+    excel-analyzer batch work QUEUE.db --results DIR [--processes N] [--lease SECONDS]
+    excel-analyzer batch status QUEUE.db [--follow SECONDS]
 
 Options:
     -v, --verbose            Show detailed information during analysis
     --json REPORT.json      Export report in JSON format
     --html REPORT.html      Export report in HTML format
+    --html-paged            Write the HTML report as a summary page plus data
+                            files (REPORT_files/) that are loaded page by page
+    --deadline SECONDS      Stop scanning worksheets after this time budget
+    --sample FRACTION       Check only this fraction of worksheet rows
+    --stats                 Collect a workbook size/shape profile
+    --rules RULE,...        Run only these rules
+    --skip-rules RULE,...   Do not run these rules
+    --parser BACKEND        XML parser backend (default: fastest installed)
+    --jobs N                Parse large worksheets as row ranges in N processes
+    --db FINDINGS.db        Append the report to a SQLite findings database
+
+Query options:
+    --since DAYS            Only runs from the last DAYS days
+    --severity LEVEL        Only findings of this severity
+    --error-type TYPE       Only findings of this error type
+    --sheet NAME            Only findings in this sheet ("Shared strings" for the SST)
+    --limit N               Maximum number of rows to print
+
+Watch options (plus the analysis options above):
+    --json-dir / --html-dir Write one report per workbook into this directory
+    --workers N             Size of the analysis worker pool
+    --settle SECONDS        Time a file must stay unchanged before analysis
+    --polling               Scan the directory instead of using inotify
 
 Example:
     excel-analyzer -v example.xlsx --json report.json
+    excel-analyzer query findings.db files --severity critical --sheet "Shared strings" --since 7
+    excel-analyzer watch /srv/uploads --db findings.db --workers 4
+    excel-analyzer batch enqueue /shared/month-end.db /shared/workbooks
+    excel-analyzer batch work /shared/month-end.db --results /shared/results --processes 8
 """
 import argparse
+import logging
+import multiprocessing
 import sys
 import os
-from .analyzer import ExcelAnalyzer
+import time
+from datetime import datetime
+from .analyzer import ExcelAnalyzer, prepare_analysis
+from .watcher import DirectoryWatcher
+from .batch import WorkQueue, BatchWorker, collect_paths
 from .models import ErrorSeverity
-from .utils.report_utils import generate_report, export_report_json, export_report_html
+from .rules import RULES
+from .utils.xml_utils import BACKENDS
+from .utils.report_utils import (generate_report, export_report_json, export_report_html,
+                                 export_report_html_paged, ReportSink)
+from .utils.db_utils import FindingsDatabase, export_report_sqlite
 
 def _get_severity_icon(severity: ErrorSeverity) -> str:
     """Get appropriate icon for severity level"""
@@ -32,20 +79,227 @@ def _get_severity_icon(severity: ErrorSeverity) -> str:
     }
     return icons.get(severity, "•")
 
+def _split_names(value: str) -> list:
+    """Parse a comma-separated option value"""
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+def _add_analysis_arguments(parser: argparse.ArgumentParser):
+    """Options controlling how each workbook is analyzed"""
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help='Time budget for the worksheet scan')
+    parser.add_argument('--sample', type=float, metavar='FRACTION',
+                        help='Fraction of worksheet rows to check (0-1]')
+    parser.add_argument('--stats', action='store_true',
+                        help='Collect workbook statistics (cell types, string lengths, part sizes)')
+    parser.add_argument('--rules', type=_split_names, metavar='RULE,...',
+                        help=f"Comma-separated rules to run (available: {', '.join(RULES)})")
+    parser.add_argument('--skip-rules', type=_split_names, metavar='RULE,...',
+                        help='Comma-separated rules to skip')
+    parser.add_argument('--parser', choices=['auto'] + list(BACKENDS), default='auto',
+                        help='XML parser backend (default: fastest installed)')
+    parser.add_argument('--jobs', type=int, metavar='N',
+                        help='Parse large worksheets as row ranges in N processes')
+
+def _analysis_options(args: argparse.Namespace) -> dict:
+    """Keyword arguments for ExcelAnalyzer.analyze_file from parsed options"""
+    return dict(deadline=args.deadline, sample=args.sample, collect_stats=args.stats,
+                rules=args.rules, skip_rules=args.skip_rules, parser=args.parser,
+                jobs=args.jobs)
+
+def _checked_analysis_options(parser: argparse.ArgumentParser, args: argparse.Namespace) -> dict:
+    """Analysis options, rejected once up front instead of on every file"""
+    options = _analysis_options(args)
+    try:
+        prepare_analysis(**options)
+    except ValueError as e:
+        parser.error(str(e))
+    return options
+
+def watch_main(argv: list):
+    """Analyze workbooks as they arrive in a drop directory"""
+    parser = argparse.ArgumentParser(prog='excel-analyzer watch',
+                                     description='Watch a directory and analyze new or modified workbooks')
+    parser.add_argument('directory', help='Directory to watch')
+    parser.add_argument('--json-dir', help='Write a JSON report per workbook into this directory')
+    parser.add_argument('--html-dir', help='Write an HTML report per workbook into this directory')
+    parser.add_argument('--html-paged', action='store_true',
+                        help='Write paged HTML reports (summary page plus data files loaded on demand)')
+    parser.add_argument('--db', help='Append reports to a SQLite findings database')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes')
+    parser.add_argument('--settle', type=float, default=2.0, metavar='SECONDS',
+                        help='Time a file must stay unchanged before it is analyzed')
+    parser.add_argument('--interval', type=float, default=1.0, metavar='SECONDS',
+                        help='Polling interval')
+    parser.add_argument('--polling', action='store_true', help='Poll the directory instead of using inotify')
+    _add_analysis_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not (args.json_dir or args.html_dir or args.db):
+        parser.error('configure at least one report sink (--json-dir, --html-dir or --db)')
+    options = _checked_analysis_options(parser, args)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    sink = ReportSink(args.json_dir, args.html_dir, args.db, html_paged=args.html_paged)
+    try:
+        watcher = DirectoryWatcher(args.directory, sink, workers=args.workers,
+                                   settle=args.settle, interval=args.interval,
+                                   use_inotify=False if args.polling else None,
+                                   analyze_options=options)
+    except (FileNotFoundError, OSError, ValueError) as e:
+        sink.close()
+        print(f"\n❌ Error: {str(e)}")
+        sys.exit(1)
+    
+    mode = "inotify" if watcher.inotify is not None else "polling"
+    print(f"👀 Watching {args.directory} ({mode}, {args.workers} workers). Press Ctrl+C to stop.")
+    try:
+        watcher.run()
+    finally:
+        watcher.close()
+        sink.close()
+    print(f"\nAnalyzed {watcher.analyzed_count}, unchanged {watcher.skipped_count}, "
+          f"failed {watcher.failed_count}")
+
+def query_main(argv: list):
+    """Run common aggregate queries against a findings database"""
+    parser = argparse.ArgumentParser(prog='excel-analyzer query',
+                                     description='Query a SQLite findings database')
+    parser.add_argument('db', help='Path to findings database')
+    parser.add_argument('report', choices=['summary', 'files', 'runs'],
+                        help='summary: counts by severity and type; files: files with findings; runs: latest runs')
+    parser.add_argument('--since', type=float, metavar='DAYS', help='Only runs from the last DAYS days')
+    parser.add_argument('--severity', choices=[sev.value for sev in ErrorSeverity])
+    parser.add_argument('--error-type', help='Only findings of this error type')
+    parser.add_argument('--sheet', help='Only findings in this sheet')
+    parser.add_argument('--limit', type=int, default=20, help='Maximum number of rows to print')
+    parser.add_argument('--all-runs', action='store_true',
+                        help="summary: count the findings of every run, not only each file's latest")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"\n❌ Error: Database does not exist: {args.db}")
+        sys.exit(1)
+    since = time.time() - args.since * 86400 if args.since is not None else None
+    filters = dict(since=since, severity=args.severity, error_type=args.error_type,
+                   sheet_name=args.sheet)
+
+    with FindingsDatabase(args.db) as db:
+        if args.report == 'summary':
+            for column, title in (('severity', 'By severity'), ('error_type', 'By error type')):
+                print(f"\n{title}:")
+                for value, count in db.count_by(column, all_runs=args.all_runs, **filters)[:args.limit]:
+                    print(f"  {count:>10}  {value}")
+        elif args.report == 'files':
+            for path, count, last_run in db.files_with_findings(limit=args.limit, **filters):
+                print(f"{count:>10}  {datetime.fromtimestamp(last_run):%Y-%m-%d %H:%M}  {path}")
+        else:
+            for path, started_at, total, mode, complete in db.recent_runs(args.limit):
+                partial = "" if complete else f" (partial: {mode})"
+                print(f"{datetime.fromtimestamp(started_at):%Y-%m-%d %H:%M}  {total:>8} issues  {path}{partial}")
+
+def _run_batch_worker(queue_path: str, results_dir: str, options: dict, worker_options: dict):
+    worker = BatchWorker(queue_path, results_dir, analyze_options=options, **worker_options)
+    worker.run()
+    print(f"🏁 Worker {worker.worker_id}: {worker.processed} done, {worker.failed} failed, "
+          f"{worker.lost} lost to other workers")
+
+def _print_batch_status(queue: WorkQueue):
+    progress = queue.progress()
+    eta = progress.eta_seconds
+    eta_text = f"{eta / 60:.1f} min" if eta is not None else "unknown"
+    counts = ', '.join(f"{state}: {count}" for state, count in sorted(progress.counts.items()))
+    print(f"📦 {progress.finished}/{progress.total} finished ({counts})")
+    print(f"   {progress.active_workers} active workers, {progress.done_last_minute} files in the last minute, "
+          f"{progress.throughput:.1f} files/min overall, ETA {eta_text}")
+
+def batch_main(argv: list):
+    """Distributed batch analysis through a shared SQLite work queue"""
+    parser = argparse.ArgumentParser(prog='excel-analyzer batch',
+                                     description='Distributed batch analysis over a shared filesystem')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    enqueue = commands.add_parser('enqueue', help='Add workbooks (files or directories) to a batch')
+    enqueue.add_argument('queue', help='Path to the queue database on the shared filesystem')
+    enqueue.add_argument('paths', nargs='+', help='Workbooks or directories to add')
+    
+    work = commands.add_parser('work', help='Process tasks until the batch is finished')
+    work.add_argument('queue', help='Path to the queue database on the shared filesystem')
+    work.add_argument('--results', required=True, help='Directory for per-file JSON results')
+    work.add_argument('--processes', type=int, default=1, help='Worker processes on this node')
+    work.add_argument('--batch-size', type=int, default=4, help='Tasks claimed per lease')
+    work.add_argument('--lease', type=float, default=120.0, metavar='SECONDS',
+                      help='Lease duration; leases are renewed every third of it')
+    work.add_argument('--max-attempts', type=int, default=3, help='Attempts before a task fails')
+    _add_analysis_arguments(work)
+    
+    status = commands.add_parser('status', help='Report batch progress and throughput')
+    status.add_argument('queue', help='Path to the queue database on the shared filesystem')
+    status.add_argument('--follow', type=float, metavar='SECONDS',
+                        help='Keep reporting every SECONDS until the batch is finished')
+    status.add_argument('--failures', type=int, default=10, help='Number of failures to list')
+    args = parser.parse_args(argv)
+
+    if args.command != 'enqueue' and not os.path.exists(args.queue):
+        print(f"\n❌ Error: Queue does not exist: {args.queue}")
+        sys.exit(1)
+    
+    if args.command == 'enqueue':
+        with WorkQueue(args.queue) as queue:
+            added = queue.enqueue(collect_paths(args.paths))
+            print(f"➕ Added {added} files ({queue.progress().total} in batch)")
+    elif args.command == 'work':
+        options = _checked_analysis_options(work, args)
+        worker_options = dict(batch_size=args.batch_size, lease=args.lease,
+                              max_attempts=args.max_attempts)
+        processes = [multiprocessing.Process(target=_run_batch_worker,
+                                             args=(args.queue, args.results, options, worker_options))
+                     for _ in range(max(1, args.processes))]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    else:
+        with WorkQueue(args.queue) as queue:
+            while True:
+                _print_batch_status(queue)
+                if not args.follow or not queue.has_open_tasks():
+                    break
+                time.sleep(args.follow)
+            for path, attempts, error in queue.failures(args.failures):
+                print(f"  ❌ {path} ({attempts} attempts): {error}")
+
+COMMANDS = {
+    'query': query_main,
+    'watch': watch_main,
+    'batch': batch_main,
+}
+
 def main():
-    parser = argparse.ArgumentParser(description='Excel File Structure Analyzer')
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+    
+    parser = argparse.ArgumentParser(description='Excel File Structure Analyzer',
+                                     epilog=f"Subcommands: {', '.join(COMMANDS)} (see excel-analyzer <command> -h)")
     parser.add_argument('file', help='Path to Excel file to analyze')
     parser.add_argument('-v', '--verbose', action='store_true', help='Show detailed information')
     parser.add_argument('--json', help='Export report to JSON file')
     parser.add_argument('--html', help='Export report to HTML file')
+    parser.add_argument('--html-paged', action='store_true',
+                        help='Write the HTML report as a summary page plus data files loaded on demand '
+                             '(for very large result sets)')
+    _add_analysis_arguments(parser)
+    parser.add_argument('--db', help='Append report to a SQLite findings database')
     args = parser.parse_args()
 
     analyzer = ExcelAnalyzer()
     try:
-        errors = analyzer.analyze_file(args.file, args.verbose)
+        errors = analyzer.analyze_file(args.file, args.verbose, **_analysis_options(args))
         
         # Generate report
-        report = generate_report(os.path.basename(args.file), errors)
+        report = generate_report(os.path.basename(args.file), errors,
+                                 analyzer.coverage, analyzer.stats, analyzer.sst_health)
         
         # Export reports if requested
         if args.json:
@@ -54,10 +308,41 @@ def main():
                 print(f"\n💾 JSON report saved to: {args.json}")
                 
         if args.html:
-            export_report_html(report, args.html)
+            if args.html_paged:
+                export_report_html_paged(report, args.html)
+            else:
+                export_report_html(report, args.html)
             if args.verbose:
                 print(f"\n💾 HTML report saved to: {args.html}")
         
+        if args.db:
+            export_report_sqlite(report, args.db, args.file)
+            if args.verbose:
+                print(f"\n💾 Findings stored in: {args.db}")
+        
+        coverage = analyzer.coverage
+        if coverage is not None and not coverage.complete:
+            print(f"\n⏱️  Partial scan ({coverage.mode}): "
+                  f"{coverage.sheets_scanned}/{coverage.sheets_total} sheets, "
+                  f"{coverage.rows_scanned}/~{coverage.rows_total} rows ({coverage.row_coverage:.1%}), "
+                  f"~{coverage.estimated_remaining_errors:.0f} errors estimated in unscanned rows")
+        
+        stats = analyzer.stats
+        if stats is not None:
+            print(f"\n📊 {stats.total_uncompressed_size} bytes uncompressed "
+                  f"({stats.total_compressed_size} compressed), "
+                  f"{stats.shared_strings} shared strings, "
+                  f"{stats.shared_string_references} shared string references")
+            for name, sheet in stats.sheets.items():
+                print(f"  • '{name}': {sheet.cells} cells in {sheet.rows} rows, "
+                      f"{sheet.formulas} formulas, used range {sheet.used_range or 'empty'}")
+        
+        health = analyzer.sst_health
+        if health is not None and health.reclaimable_bytes:
+            unreferenced = health.unreferenced if health.unreferenced is not None else "?"
+            print(f"\n🧹 Shared strings: {health.duplicates} duplicate and {unreferenced} unreferenced "
+                  f"of {health.entries} entries, about {health.reclaimable_bytes} bytes reclaimable")
+        
         # Print results summary
         if not errors:
             print("\n✅ No issues found")
@@ -18,6 +18,11 @@ class ExcelLimits:
     MAX_NESTED_FUNCTIONS = 64
     MAX_ARGUMENTS = 255
     MAX_SHEETS = 255
+    MAX_NUMBER = 9.99999999999999e307
+    MIN_POSITIVE_NUMBER = 2.2250738585072e-308
+    MAX_NUMBER_PRECISION = 15  # significant digits
+    MAX_DATE_SERIAL_1900 = 2958465  # 9999-12-31
+    MAX_DATE_SERIAL_1904 = 2957003  # 9999-12-31
 
 class XMLNamespaces:
     MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
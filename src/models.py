@@ -6,10 +6,17 @@ It includes error representations, analysis context, and report formats.
 Key classes:
 - CellError: Represents an issue found in a specific cell
 - AnalysisContext: Holds the current analysis state
+- ScanCoverage: Describes how much of the workbook a budgeted scan covered
+- WorkbookStats: Optional size/shape profile collected during the scan
 - AnalysisReport: Contains the complete analysis results"""
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional, Dict, List
+from typing import TYPE_CHECKING, Optional, Dict, FrozenSet, List, Tuple
+
+if TYPE_CHECKING:
+    from .rules import AnalysisPlan
+    from .utils.xml_utils import ParserBackend
 
 class ErrorSeverity(Enum):
     """Error severity levels"""
@@ -28,10 +35,400 @@ class CellError:
     severity: ErrorSeverity = ErrorSeverity.ERROR
     fix_suggestion: Optional[str] = None
 
+@dataclass
+class ScanCoverage:
+    """Coverage achieved by the worksheet scan
+
+    A full scan has ``complete`` set unless a worksheet failed to parse.
+    Deadline and sampled scans record how many sheets and rows were
+    actually checked so that a partial result is reported as partial
+    rather than as clean."""
+    mode: str = "full"
+    sheets_total: int = 0
+    sheets_scanned: int = 0
+    rows_total: int = 0
+    rows_scanned: int = 0
+    cell_errors: int = 0
+    elapsed: float = 0.0
+    deadline_reached: bool = False
+    sample_rate: Optional[float] = None
+    skipped_sheets: List[str] = field(default_factory=list)
+    failed_sheets: List[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        """Whether every row of every sheet was checked"""
+        return (self.sheets_scanned == self.sheets_total
+                and self.rows_scanned >= self.rows_total)
+
+    @property
+    def row_coverage(self) -> float:
+        """Fraction of the (estimated) rows that were checked"""
+        if self.rows_total <= 0:
+            return 1.0
+        return min(1.0, self.rows_scanned / self.rows_total)
+
+    @property
+    def error_rate(self) -> float:
+        """Cell errors found per scanned row"""
+        if self.rows_scanned <= 0:
+            return 0.0
+        return self.cell_errors / self.rows_scanned
+
+    @property
+    def estimated_remaining_errors(self) -> float:
+        """Cell errors expected in the rows that were not checked"""
+        return self.error_rate * max(0, self.rows_total - self.rows_scanned)
+
+    def to_dict(self) -> dict:
+        """Convert coverage to dictionary format"""
+        return {
+            "mode": self.mode,
+            "complete": self.complete,
+            "sheets_total": self.sheets_total,
+            "sheets_scanned": self.sheets_scanned,
+            "skipped_sheets": list(self.skipped_sheets),
+            "failed_sheets": list(self.failed_sheets),
+            "rows_total": self.rows_total,
+            "rows_scanned": self.rows_scanned,
+            "row_coverage": round(self.row_coverage, 4),
+            "sample_rate": self.sample_rate,
+            "cell_errors": self.cell_errors,
+            "error_rate": round(self.error_rate, 6),
+            "estimated_remaining_errors": round(self.estimated_remaining_errors, 1),
+            "elapsed": round(self.elapsed, 3),
+            "deadline_reached": self.deadline_reached
+        }
+
+class LengthHistogram:
+    """Fixed-bucket histogram of string lengths
+
+    Bucket 0 holds empty strings and bucket ``k`` holds lengths in
+    ``[2**(k-1), 2**k)``, so recording a value is a single ``bit_length``
+    call and memory does not grow with the number of values."""
+    BUCKETS = 18  # last bucket is open-ended (>= 65536)
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0
+        self.max_length = 0
+
+    def add(self, length: int):
+        self.counts[min(length.bit_length(), self.BUCKETS - 1)] += 1
+        self.total += length
+        if length > self.max_length:
+            self.max_length = length
+
+    def merge(self, other: 'LengthHistogram'):
+        """Add the values recorded by another histogram"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.max_length = max(self.max_length, other.max_length)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    @classmethod
+    def bucket_label(cls, index: int) -> str:
+        if index == 0:
+            return "0"
+        low = 1 << (index - 1)
+        if index == cls.BUCKETS - 1:
+            return f"{low}+"
+        high = (1 << index) - 1
+        return str(low) if low == high else f"{low}-{high}"
+
+    def to_dict(self) -> dict:
+        count = self.count
+        return {
+            "count": count,
+            "max_length": self.max_length,
+            "mean_length": round(self.total / count, 2) if count else 0,
+            "buckets": {
+                self.bucket_label(i): n for i, n in enumerate(self.counts) if n
+            }
+        }
+
+@dataclass
+class PartStats:
+    """Compressed and decompressed size of one package part"""
+    name: str
+    compressed_size: int
+    uncompressed_size: int
+
+    @property
+    def compression_ratio(self) -> float:
+        if self.compressed_size <= 0:
+            return 0.0
+        return self.uncompressed_size / self.compressed_size
+
+    def to_dict(self) -> dict:
+        return {
+            "compressed_size": self.compressed_size,
+            "uncompressed_size": self.uncompressed_size,
+            "compression_ratio": round(self.compression_ratio, 2)
+        }
+
+@dataclass
+class SheetStats:
+    """Per-worksheet counters collected while scanning its rows"""
+    name: str
+    declared_range: Optional[str] = None
+    rows: int = 0
+    cells: int = 0
+    formulas: int = 0
+    cells_by_type: Dict[str, int] = field(default_factory=dict)
+    string_lengths: LengthHistogram = field(default_factory=LengthHistogram)
+    min_row: int = 0
+    max_row: int = 0
+    min_column: int = 0
+    max_column: int = 0
+
+    def merge(self, other: 'SheetStats'):
+        """Add the counters of another scan of the same sheet (e.g. a row range)"""
+        self.rows += other.rows
+        self.cells += other.cells
+        self.formulas += other.formulas
+        for cell_type, count in other.cells_by_type.items():
+            self.cells_by_type[cell_type] = self.cells_by_type.get(cell_type, 0) + count
+        self.string_lengths.merge(other.string_lengths)
+        for attr in ('min_row', 'min_column'):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            if theirs and (not mine or theirs < mine):
+                setattr(self, attr, theirs)
+        self.max_row = max(self.max_row, other.max_row)
+        self.max_column = max(self.max_column, other.max_column)
+
+    @property
+    def used_range(self) -> Optional[str]:
+        """Range actually occupied by cells, e.g. 'A1:D20'"""
+        if not self.max_row or not self.max_column:
+            return None
+        # Imported here: src.utils imports validators, which imports this module
+        from .utils.xml_utils import column_letter
+        return (f"{column_letter(self.min_column)}{self.min_row}:"
+                f"{column_letter(self.max_column)}{self.max_row}")
+
+    def to_dict(self) -> dict:
+        return {
+            "declared_range": self.declared_range,
+            "used_range": self.used_range,
+            "rows": self.rows,
+            "cells": self.cells,
+            "formulas": self.formulas,
+            "cells_by_type": dict(self.cells_by_type),
+            "string_lengths": self.string_lengths.to_dict()
+        }
+
+@dataclass
+class WorkbookStats:
+    """Profile of what makes a workbook heavy
+
+    Only counters and fixed-bucket histograms are kept. Under a sampled or
+    deadline scan the sheet counters cover the scanned rows only."""
+    sheets: Dict[str, SheetStats] = field(default_factory=dict)
+    parts: Dict[str, PartStats] = field(default_factory=dict)
+    shared_strings: int = 0
+    shared_strings_declared_count: Optional[int] = None
+    shared_strings_declared_unique: Optional[int] = None
+    shared_string_lengths: LengthHistogram = field(default_factory=LengthHistogram)
+    shared_string_references: int = 0
+
+    @property
+    def unique_to_referenced_ratio(self) -> Optional[float]:
+        """SST entries per shared-string cell reference"""
+        if not self.shared_string_references:
+            return None
+        return self.shared_strings / self.shared_string_references
+
+    @property
+    def total_compressed_size(self) -> int:
+        return sum(p.compressed_size for p in self.parts.values())
+
+    @property
+    def total_uncompressed_size(self) -> int:
+        return sum(p.uncompressed_size for p in self.parts.values())
+
+    def to_dict(self) -> dict:
+        ratio = self.unique_to_referenced_ratio
+        return {
+            "shared_strings": {
+                "entries": self.shared_strings,
+                "declared_count": self.shared_strings_declared_count,
+                "declared_unique_count": self.shared_strings_declared_unique,
+                "references": self.shared_string_references,
+                "unique_to_referenced_ratio": round(ratio, 4) if ratio is not None else None,
+                "string_lengths": self.shared_string_lengths.to_dict()
+            },
+            "sheets": {name: sheet.to_dict() for name, sheet in self.sheets.items()},
+            "parts": {name: part.to_dict() for name, part in self.parts.items()},
+            "total_compressed_size": self.total_compressed_size,
+            "total_uncompressed_size": self.total_uncompressed_size
+        }
+
+# Bytes of markup around the text of a plain <si><t>...</t></si> entry
+SI_MARKUP_BYTES = len('<si><t></t></si>')
+
+@dataclass
+class SharedStringHealth:
+    """Duplicate, unreferenced and count checks of the shared strings table
+
+    Entries are recorded while the table is parsed as a 64-bit hash and an
+    estimated XML size in flat arrays (12 bytes per entry), references
+    while the worksheets are scanned as one bit per entry, so tables with
+    millions of entries stay cheap. Duplicates are found from the hashes
+    once the table is read, ``finish`` then derives unreferenced entries
+    and reclaimable bytes. Unreferenced entries and the ``count``
+    attribute are only judged after a complete scan."""
+    entries: int = 0
+    declared_count: Optional[int] = None
+    declared_unique: Optional[int] = None
+    duplicates: int = 0
+    duplicate_bytes: int = 0
+    duplicate_examples: List[Tuple[int, int]] = field(default_factory=list)
+    references: int = 0
+    invalid_references: int = 0
+    references_complete: bool = False
+    unreferenced: Optional[int] = None
+    unreferenced_bytes: Optional[int] = None
+    unreferenced_examples: List[int] = field(default_factory=list)
+    reclaimable_bytes: int = 0
+    hashes: array = field(default_factory=lambda: array('q'), repr=False)
+    sizes: array = field(default_factory=lambda: array('I'), repr=False)
+    duplicate_bitmap: bytearray = field(default_factory=bytearray, repr=False)
+    reference_bitmap: bytearray = field(default_factory=bytearray, repr=False)
+
+    MAX_EXAMPLES = 10
+
+    def add_entry(self, text: Optional[str], formatting: Optional[str] = None):
+        """Record the next <si> entry by its full text and rich text formatting
+
+        Entries with equal text but different run formatting display
+        differently, so they are not duplicates of each other."""
+        self.hashes.append(hash(text) if formatting is None else hash((text, formatting)))
+        if not text:
+            self.sizes.append(SI_MARKUP_BYTES)
+        elif text.isascii():
+            self.sizes.append(SI_MARKUP_BYTES + len(text))
+        else:
+            self.sizes.append(SI_MARKUP_BYTES + len(text.encode('utf-8')))
+
+    def finish_entries(self):
+        """Find duplicate entries once the whole table has been read"""
+        hashes = self.hashes
+        self.entries = len(hashes)
+        self.duplicate_bitmap = bytearray((self.entries + 7) // 8)
+        # Counting distinct hashes runs in C; only a table that does have
+        # duplicates is walked entry by entry to locate them
+        if len(set(hashes)) < self.entries:
+            seen = set()
+            for index, digest in enumerate(hashes):
+                if digest not in seen:
+                    seen.add(digest)
+                    continue
+                self.duplicates += 1
+                self.duplicate_bytes += self.sizes[index]
+                self.duplicate_bitmap[index >> 3] |= 1 << (index & 7)
+                if len(self.duplicate_examples) < self.MAX_EXAMPLES:
+                    self.duplicate_examples.append((index, hashes.index(digest)))
+        self.hashes = array('q')
+        self.start_references()
+
+    def start_references(self):
+        """Allocate the reference bitmap once the number of entries is known"""
+        self.reference_bitmap = bytearray((self.entries + 7) // 8)
+        self.references = self.invalid_references = 0
+
+    def mark_references(self, values: List[Optional[str]]):
+        """Record cell references (the <v> of t="s" cells) to entries"""
+        bitmap, entries = self.reference_bitmap, self.entries
+        self.references += len(values)
+        for value in values:
+            try:
+                index = int(value)
+            except (TypeError, ValueError):
+                index = -1
+            if 0 <= index < entries:
+                bitmap[index >> 3] |= 1 << (index & 7)
+            else:
+                self.invalid_references += 1
+
+    def merge_references(self, bitmap: bytes, references: int, invalid_references: int):
+        """Add the references recorded by a separate scan (e.g. a row range)"""
+        merged = int.from_bytes(self.reference_bitmap, 'little') | int.from_bytes(bitmap, 'little')
+        self.reference_bitmap = bytearray(merged.to_bytes(len(self.reference_bitmap), 'little'))
+        self.references += references
+        self.invalid_references += invalid_references
+
+    def finish(self, references_complete: bool):
+        """Derive unreferenced entries and reclaimable bytes
+
+        The per-entry arrays are released afterwards, so a finished health
+        record is small enough to be sent back from worker processes."""
+        self.references_complete = references_complete
+        self.reclaimable_bytes = self.duplicate_bytes
+        if references_complete:
+            self._count_unreferenced()
+        else:
+            self.unreferenced = self.unreferenced_bytes = None
+        self.sizes = array('I')
+        self.duplicate_bitmap = bytearray()
+        self.reference_bitmap = bytearray()
+
+    def _count_unreferenced(self):
+        unreferenced = unreferenced_bytes = 0
+        sizes, duplicates = self.sizes, self.duplicate_bitmap
+        for byte_index, bits in enumerate(self.reference_bitmap):
+            if bits == 0xFF:
+                continue
+            for bit in range(8):
+                index = byte_index * 8 + bit
+                if index >= self.entries:
+                    break
+                if bits >> bit & 1:
+                    continue
+                unreferenced += 1
+                unreferenced_bytes += sizes[index]
+                if len(self.unreferenced_examples) < self.MAX_EXAMPLES:
+                    self.unreferenced_examples.append(index)
+                if not duplicates[byte_index] >> bit & 1:
+                    self.reclaimable_bytes += sizes[index]
+        self.unreferenced = unreferenced
+        self.unreferenced_bytes = unreferenced_bytes
+
+    def to_dict(self) -> dict:
+        return {
+            "entries": self.entries,
+            "declared_count": self.declared_count,
+            "declared_unique": self.declared_unique,
+            "duplicates": self.duplicates,
+            "duplicate_bytes": self.duplicate_bytes,
+            "duplicate_examples": [list(example) for example in self.duplicate_examples],
+            "references": self.references,
+            "invalid_references": self.invalid_references,
+            "references_complete": self.references_complete,
+            "unreferenced": self.unreferenced,
+            "unreferenced_bytes": self.unreferenced_bytes,
+            "unreferenced_examples": list(self.unreferenced_examples),
+            "reclaimable_bytes": self.reclaimable_bytes
+        }
+
 @dataclass
 class AnalysisContext:
     verbose: bool
     long_string_index: int = None
+    deadline: Optional[float] = None
+    sample_rate: Optional[float] = None
+    coverage: Optional[ScanCoverage] = None
+    stats: Optional[WorkbookStats] = None
+    plan: Optional['AnalysisPlan'] = None
+    parser: Optional['ParserBackend'] = None
+    sheet_names: Dict[str, str] = field(default_factory=dict)
+    jobs: int = 1
+    sst_health: Optional[SharedStringHealth] = None
+    date_styles: FrozenSet[int] = frozenset()
+    date1904: bool = False
 
 @dataclass
 class AnalysisReport:
@@ -40,10 +437,13 @@ class AnalysisReport:
     total_errors: int
     errors_by_severity: Dict[ErrorSeverity, List[CellError]]
     errors_by_sheet: Dict[str, List[CellError]]
+    coverage: Optional[ScanCoverage] = None
+    stats: Optional[WorkbookStats] = None
+    sst_health: Optional[SharedStringHealth] = None
     
     def to_dict(self) -> dict:
         """Convert report to dictionary format"""
-        return {
+        data = {
             "file_name": self.file_name,
             "total_errors": self.total_errors,
             "errors_by_severity": {
@@ -55,6 +455,13 @@ class AnalysisReport:
                 for sheet, errs in self.errors_by_sheet.items()
             }
         }
+        if self.coverage is not None:
+            data["coverage"] = self.coverage.to_dict()
+        if self.stats is not None:
+            data["stats"] = self.stats.to_dict()
+        if self.sst_health is not None:
+            data["sst_health"] = self.sst_health.to_dict()
+        return data
     
     @staticmethod
     def _error_to_dict(error: CellError) -> dict:
@@ -0,0 +1,307 @@
+"""Rule registry and analysis planner
+
+Every check the analyzer runs is registered here as a Rule. A rule
+declares the package parts it needs and the element type it inspects,
+so the planner can work out which parts have to be decompressed and
+parsed for a given selection of rules.
+
+Part kinds:
+- workbook: xl/workbook.xml
+- shared_strings: xl/sharedStrings.xml
+- worksheets: xl/worksheets/sheet*.xml
+- styles: xl/styles.xml (which cell styles display dates)
+
+Element kinds:
+- sheet: a <sheet> entry of workbook.xml, checked with (name)
+- si: a shared string entry, checked with (text, index)
+- c: a cell string value, checked with (text, cell_ref, sheet_name)
+- sst: the whole shared strings table, checked with (health) once the
+  worksheets have been scanned; see ``models.SharedStringHealth``
+- num: a batch of numeric cell values, checked with (column, sheet_name);
+  see ``numeric_utils.NumericColumn``
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+from .models import CellError, ErrorSeverity, SharedStringHealth
+from .constants import ExcelLimits, ZERO_WIDTH_CHARS
+from .utils import xml_utils
+from .utils.numeric_utils import NumericColumn
+
+PART_WORKBOOK = 'workbook'
+PART_SHARED_STRINGS = 'shared_strings'
+PART_WORKSHEETS = 'worksheets'
+PART_STYLES = 'styles'
+
+ELEMENT_SHEET = 'sheet'
+ELEMENT_SHARED_STRING = 'si'
+ELEMENT_CELL = 'c'
+ELEMENT_SHARED_STRING_TABLE = 'sst'
+ELEMENT_NUMBER = 'num'
+
+@dataclass(frozen=True)
+class Rule:
+    """A single registered check"""
+    name: str
+    description: str
+    parts: FrozenSet[str]
+    element: str
+    severity: ErrorSeverity
+    check: Callable[..., List[CellError]]
+
+RULES: Dict[str, Rule] = {}
+
+def register_rule(name: str, description: str, parts: Iterable[str], element: str,
+                  severity: ErrorSeverity = ErrorSeverity.ERROR):
+    """Decorator registering a check function as a rule"""
+    def decorator(check: Callable[..., List[CellError]]):
+        if name in RULES:
+            raise ValueError(f"Rule already registered: {name}")
+        RULES[name] = Rule(name, description, frozenset(parts), element, severity, check)
+        return check
+    return decorator
+
+def select_rules(rules: Optional[Iterable[str]] = None,
+                 skip_rules: Optional[Iterable[str]] = None) -> List[Rule]:
+    """Resolve --rules / --skip-rules selections to registered rules"""
+    requested = list(rules) if rules is not None else list(RULES)
+    skipped = set(skip_rules or ())
+    unknown = [name for name in requested + sorted(skipped) if name not in RULES]
+    if unknown:
+        raise ValueError(f"Unknown rule(s): {', '.join(unknown)}. "
+                         f"Available rules: {', '.join(RULES)}")
+    return [RULES[name] for name in requested if name not in skipped]
+
+class AnalysisPlan:
+    """Which parts to parse and which rules to dispatch per element type"""
+
+    def __init__(self, rules: List[Rule], extra_parts: Iterable[str] = ()):
+        self.rules = rules
+        self.parts = set(extra_parts)
+        self._by_element: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            self.parts.update(rule.parts)
+            self._by_element.setdefault(rule.element, []).append(rule)
+        # Worksheets are named through workbook.xml
+        if PART_WORKSHEETS in self.parts:
+            self.parts.add(PART_WORKBOOK)
+
+    @classmethod
+    def build(cls, rules: Optional[Iterable[str]] = None,
+              skip_rules: Optional[Iterable[str]] = None,
+              extra_parts: Iterable[str] = ()) -> 'AnalysisPlan':
+        return cls(select_rules(rules, skip_rules), extra_parts)
+
+    def needs(self, part: str) -> bool:
+        return part in self.parts
+
+    def rules_for(self, element: str) -> List[Rule]:
+        return self._by_element.get(element, [])
+
+    @property
+    def rule_names(self) -> List[str]:
+        return [rule.name for rule in self.rules]
+
+@register_rule('sheet-name-length', "Sheet name exceeds Excel's length limit",
+               [PART_WORKBOOK], ELEMENT_SHEET)
+def check_sheet_name_length(name: str) -> List[CellError]:
+    if len(name) <= ExcelLimits.MAX_SHEET_NAME_LENGTH:
+        return []
+    return [CellError(
+        sheet_name=name,
+        row=0,
+        column="",
+        error_type="Sheet name too long",
+        details=f"Sheet name length ({len(name)}) exceeds Excel limit ({ExcelLimits.MAX_SHEET_NAME_LENGTH})",
+        severity=RULES['sheet-name-length'].severity,
+        fix_suggestion=f"Rename the sheet to use fewer than {ExcelLimits.MAX_SHEET_NAME_LENGTH} characters"
+    )]
+
+@register_rule('sst-long-string', "Shared string exceeds Excel's length limit",
+               [PART_SHARED_STRINGS], ELEMENT_SHARED_STRING)
+def check_shared_string_length(text: str, index: int) -> List[CellError]:
+    if len(text) <= ExcelLimits.MAX_STRING_LENGTH:
+        return []
+    return [CellError(
+        sheet_name="Shared strings",
+        row=0,
+        column="",
+        error_type="Long string",
+        details=f"String index {index} length ({len(text)}) exceeds Excel limit ({ExcelLimits.MAX_STRING_LENGTH})",
+        severity=RULES['sst-long-string'].severity,
+        fix_suggestion="Split the string into multiple cells or store in external resource"
+    )]
+
+@register_rule('sst-zero-width', "Shared string contains zero-width characters",
+               [PART_SHARED_STRINGS], ELEMENT_SHARED_STRING, ErrorSeverity.WARNING)
+def check_shared_string_zero_width(text: str, index: int) -> List[CellError]:
+    if not any(c in text for c in ZERO_WIDTH_CHARS):
+        return []
+    return [CellError(
+        sheet_name="Shared strings",
+        row=0,
+        column="",
+        error_type="Special character",
+        details=f"String index {index} contains zero-width character",
+        severity=RULES['sst-zero-width'].severity,
+        fix_suggestion="Remove or replace zero-width characters"
+    )]
+
+@register_rule('cell-long-string', "Cell string exceeds Excel's length limit",
+               [PART_WORKSHEETS], ELEMENT_CELL)
+def check_cell_string_length(text: str, cell_ref: str, sheet_name: str) -> List[CellError]:
+    if len(text) <= ExcelLimits.MAX_STRING_LENGTH:
+        return []
+    col, row = xml_utils.parse_cell_reference(cell_ref)
+    return [CellError(
+        sheet_name=sheet_name,
+        row=row,
+        column=col,
+        error_type="Long string",
+        details=f"Cell string length ({len(text)}) exceeds Excel limit ({ExcelLimits.MAX_STRING_LENGTH})",
+        severity=RULES['cell-long-string'].severity,
+        fix_suggestion="Split the string into multiple cells or store in external resource"
+    )]
+
+@register_rule('cell-zero-width', "Cell string contains zero-width characters",
+               [PART_WORKSHEETS], ELEMENT_CELL, ErrorSeverity.WARNING)
+def check_cell_zero_width(text: str, cell_ref: str, sheet_name: str) -> List[CellError]:
+    if not any(c in text for c in ZERO_WIDTH_CHARS):
+        return []
+    col, row = xml_utils.parse_cell_reference(cell_ref)
+    return [CellError(
+        sheet_name=sheet_name,
+        row=row,
+        column=col,
+        error_type="Special character",
+        details="Cell contains zero-width character",
+        severity=RULES['cell-zero-width'].severity,
+        fix_suggestion="Remove or replace zero-width characters"
+    )]
+
+@register_rule('sst-duplicates', "Shared strings table holds duplicate entries",
+               [PART_SHARED_STRINGS], ELEMENT_SHARED_STRING_TABLE, ErrorSeverity.WARNING)
+def check_shared_string_duplicates(health: SharedStringHealth) -> List[CellError]:
+    if not health.duplicates:
+        return []
+    examples = ', '.join(f"{index} = {first}" for index, first in health.duplicate_examples[:5])
+    return [CellError(
+        sheet_name="Shared strings",
+        row=0,
+        column="",
+        error_type="Duplicate shared strings",
+        details=f"{health.duplicates} of {health.entries} entries repeat an earlier entry "
+                f"(e.g. index {examples}); about {health.duplicate_bytes} bytes reclaimable",
+        severity=RULES['sst-duplicates'].severity,
+        fix_suggestion="Re-save the workbook in Excel or deduplicate the table in the generator"
+    )]
+
+@register_rule('sst-unreferenced', "Shared strings table holds entries no cell uses",
+               [PART_SHARED_STRINGS, PART_WORKSHEETS], ELEMENT_SHARED_STRING_TABLE, ErrorSeverity.WARNING)
+def check_shared_string_unreferenced(health: SharedStringHealth) -> List[CellError]:
+    if not health.unreferenced:
+        return []
+    examples = ', '.join(str(index) for index in health.unreferenced_examples[:5])
+    return [CellError(
+        sheet_name="Shared strings",
+        row=0,
+        column="",
+        error_type="Unreferenced shared strings",
+        details=f"{health.unreferenced} of {health.entries} entries are not referenced by any cell "
+                f"(e.g. index {examples}); about {health.unreferenced_bytes} bytes reclaimable",
+        severity=RULES['sst-unreferenced'].severity,
+        fix_suggestion="Re-save the workbook in Excel or drop unused strings in the generator"
+    )]
+
+@register_rule('sst-counts', "Shared strings table count attributes do not match its use",
+               [PART_SHARED_STRINGS, PART_WORKSHEETS], ELEMENT_SHARED_STRING_TABLE)
+def check_shared_string_counts(health: SharedStringHealth) -> List[CellError]:
+    errors = []
+    severity = RULES['sst-counts'].severity
+    if health.declared_unique is not None and health.declared_unique != health.entries:
+        errors.append(CellError(
+            sheet_name="Shared strings",
+            row=0,
+            column="",
+            error_type="Shared string count mismatch",
+            details=f"uniqueCount is {health.declared_unique} but the table has {health.entries} entries",
+            severity=severity,
+            fix_suggestion="Set uniqueCount to the number of <si> entries"
+        ))
+    if (health.references_complete and health.declared_count is not None
+            and health.declared_count != health.references):
+        errors.append(CellError(
+            sheet_name="Shared strings",
+            row=0,
+            column="",
+            error_type="Shared string count mismatch",
+            details=f"count is {health.declared_count} but cells reference the table "
+                    f"{health.references} times",
+            severity=severity,
+            fix_suggestion="Set count to the number of cells with t=\"s\""
+        ))
+    if health.invalid_references:
+        errors.append(CellError(
+            sheet_name="Shared strings",
+            row=0,
+            column="",
+            error_type="Invalid shared string reference",
+            details=f"{health.invalid_references} cells reference an entry outside the table "
+                    f"({health.entries} entries)",
+            severity=ErrorSeverity.CRITICAL,
+            fix_suggestion="The file may be corrupted; Excel will drop these values when repairing it"
+        ))
+    return errors
+
+def _numeric_errors(rule_name: str, column: NumericColumn, indices: List[int], sheet_name: str,
+                    error_type: str, details: str, fix_suggestion: str) -> List[CellError]:
+    """One error per offending cell of a numeric column; ``details`` may use {value}"""
+    errors = []
+    severity = RULES[rule_name].severity
+    for i in indices:
+        col, row = xml_utils.parse_cell_reference(column.refs[i])
+        errors.append(CellError(
+            sheet_name=sheet_name,
+            row=row,
+            column=col,
+            error_type=error_type,
+            details=details.format(value=column.texts[i]),
+            severity=severity,
+            fix_suggestion=fix_suggestion
+        ))
+    return errors
+
+@register_rule('num-invalid', "Numeric cell holds NaN, INF or text that is not a number",
+               [PART_WORKSHEETS], ELEMENT_NUMBER)
+def check_number_invalid(column: NumericColumn, sheet_name: str) -> List[CellError]:
+    return _numeric_errors('num-invalid', column, column.invalid(), sheet_name,
+                           "Invalid number", "Numeric cell value '{value}' is not a number",
+                           "Write a finite number, or store the value as text with t=\"str\"")
+
+@register_rule('num-out-of-range', "Numeric cell value is beyond Excel's number range",
+               [PART_WORKSHEETS], ELEMENT_NUMBER)
+def check_number_range(column: NumericColumn, sheet_name: str) -> List[CellError]:
+    return _numeric_errors('num-out-of-range', column, column.out_of_range(), sheet_name,
+                           "Number out of range",
+                           f"Value {{value}} is outside Excel's range "
+                           f"({ExcelLimits.MIN_POSITIVE_NUMBER:g} to {ExcelLimits.MAX_NUMBER:g})",
+                           "Scale the value or store it as text")
+
+@register_rule('num-precision', "Integer has more significant digits than Excel keeps",
+               [PART_WORKSHEETS], ELEMENT_NUMBER, ErrorSeverity.WARNING)
+def check_number_precision(column: NumericColumn, sheet_name: str) -> List[CellError]:
+    return _numeric_errors('num-precision', column, column.imprecise(), sheet_name,
+                           "Precision loss",
+                           f"Value {{value}} has more than {ExcelLimits.MAX_NUMBER_PRECISION} "
+                           f"significant digits; Excel will round it",
+                           "Store identifiers such as account or card numbers as text")
+
+@register_rule('date-out-of-range', "Date-formatted cell is outside the workbook's date system",
+               [PART_WORKSHEETS, PART_STYLES], ELEMENT_NUMBER, ErrorSeverity.WARNING)
+def check_date_range(column: NumericColumn, sheet_name: str) -> List[CellError]:
+    system = "1904" if column.date1904 else "1900"
+    return _numeric_errors('date-out-of-range', column, column.dates_out_of_range(), sheet_name,
+                           "Date out of range",
+                           f"Date serial {{value}} is outside the {system} date system "
+                           f"(0 to {column.max_date_serial}); Excel shows it as ####",
+                           "Check the date conversion in the generator or use a non-date number format")
@@ -0,0 +1,208 @@
+"""SQLite findings database
+
+Stores analysis reports from many workbooks in one indexed database so
+fleet-wide questions ("which files had critical shared string errors
+this week?") are a single query instead of a scan over report files.
+
+Schema:
+- files: one row per analyzed path
+- runs: one row per analysis of a file
+- parts: package part sizes of a run (when statistics were collected)
+- findings: one row per CellError of a run
+
+The database uses SQLite's rollback journal by default, like the batch
+work queue, because WAL needs shared memory and only works when every
+writer is on the same host; reports from watch and batch nodes are
+meant to land in one database on a shared disk. Pass ``wal=True`` for a
+database that only local processes write to.
+"""
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from ..models import AnalysisReport, CellError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    started_at REAL NOT NULL,
+    file_size INTEGER,
+    file_mtime REAL,
+    total_errors INTEGER NOT NULL,
+    coverage_mode TEXT,
+    complete INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS parts (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    compressed_size INTEGER NOT NULL,
+    uncompressed_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    severity TEXT NOT NULL,
+    error_type TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    column TEXT NOT NULL,
+    details TEXT NOT NULL,
+    fix_suggestion TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_file ON runs(file_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_parts_run ON parts(run_id);
+CREATE INDEX IF NOT EXISTS idx_findings_run ON findings(run_id);
+CREATE INDEX IF NOT EXISTS idx_findings_file ON findings(file_id);
+CREATE INDEX IF NOT EXISTS idx_findings_severity ON findings(severity, error_type);
+CREATE INDEX IF NOT EXISTS idx_findings_type ON findings(error_type);
+"""
+
+def _finding_rows(run_id: int, file_id: int, errors: Iterable[CellError]):
+    for error in errors:
+        yield (run_id, file_id, error.severity.value, error.error_type, error.sheet_name,
+               error.row, error.column, error.details, error.fix_suggestion)
+
+class FindingsDatabase:
+    """Bulk writer and query helper for the findings database"""
+
+    def __init__(self, path: str, wal: bool = False):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        if wal:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        else:
+            self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'FindingsDatabase':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _file_id(self, path: str, name: str) -> int:
+        row = self.conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        if row:
+            return row[0]
+        return self.conn.execute("INSERT INTO files (path, name) VALUES (?, ?)",
+                                 (path, name)).lastrowid
+
+    def _insert_report(self, report: AnalysisReport, file_path: Optional[str],
+                       started_at: Optional[float]) -> int:
+        path = os.path.abspath(file_path) if file_path else report.file_name
+        file_id = self._file_id(path, report.file_name)
+        size = mtime = None
+        if file_path and os.path.exists(file_path):
+            info = os.stat(file_path)
+            size, mtime = info.st_size, info.st_mtime
+        coverage = report.coverage
+        run_id = self.conn.execute(
+            "INSERT INTO runs (file_id, started_at, file_size, file_mtime, total_errors, "
+            "coverage_mode, complete) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (file_id, started_at if started_at is not None else time.time(), size, mtime,
+             report.total_errors, coverage.mode if coverage else None,
+             int(coverage.complete) if coverage else 1)
+        ).lastrowid
+
+        errors = (err for errs in report.errors_by_severity.values() for err in errs)
+        self.conn.executemany(
+            "INSERT INTO findings (run_id, file_id, severity, error_type, sheet_name, row, "
+            "column, details, fix_suggestion) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            _finding_rows(run_id, file_id, errors)
+        )
+        if report.stats is not None:
+            self.conn.executemany(
+                "INSERT INTO parts (run_id, name, compressed_size, uncompressed_size) "
+                "VALUES (?, ?, ?, ?)",
+                ((run_id, part.name, part.compressed_size, part.uncompressed_size)
+                 for part in report.stats.parts.values())
+            )
+        return run_id
+
+    def record_report(self, report: AnalysisReport, file_path: Optional[str] = None,
+                      started_at: Optional[float] = None) -> int:
+        """Store one report in its own transaction and return the run id"""
+        with self.conn:
+            return self._insert_report(report, file_path, started_at)
+
+    def record_reports(self, reports: Iterable[Tuple[AnalysisReport, Optional[str]]]) -> List[int]:
+        """Store many (report, file_path) pairs in a single transaction"""
+        with self.conn:
+            return [self._insert_report(report, file_path, None) for report, file_path in reports]
+
+    @staticmethod
+    def _filters(since: Optional[float], severity: Optional[str], error_type: Optional[str],
+                 sheet_name: Optional[str], latest_only: bool = True) -> Tuple[str, list]:
+        clauses, params = [], []
+        if latest_only:
+            clauses.append("r.id = (SELECT MAX(id) FROM runs WHERE file_id = f.file_id)")
+        if since is not None:
+            clauses.append("r.started_at >= ?")
+            params.append(since)
+        if severity:
+            clauses.append("f.severity = ?")
+            params.append(severity)
+        if error_type:
+            clauses.append("f.error_type = ?")
+            params.append(error_type)
+        if sheet_name:
+            clauses.append("f.sheet_name = ?")
+            params.append(sheet_name)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count_by(self, column: str, since: Optional[float] = None, severity: Optional[str] = None,
+                 error_type: Optional[str] = None, sheet_name: Optional[str] = None,
+                 all_runs: bool = False) -> List[Tuple[str, int]]:
+        """Number of findings grouped by 'severity', 'error_type' or 'sheet_name'
+
+        Only each file's latest run counts, so re-analyzing a file does not
+        inflate the totals; ``all_runs`` counts the findings of every run.
+        """
+        if column not in ('severity', 'error_type', 'sheet_name'):
+            raise ValueError(f"Cannot group findings by {column}")
+        where, params = self._filters(since, severity, error_type, sheet_name, latest_only=not all_runs)
+        return self.conn.execute(
+            f"SELECT f.{column}, COUNT(*) FROM findings f JOIN runs r ON r.id = f.run_id"
+            f"{where} GROUP BY f.{column} ORDER BY COUNT(*) DESC", params
+        ).fetchall()
+
+    def files_with_findings(self, since: Optional[float] = None, severity: Optional[str] = None,
+                            error_type: Optional[str] = None, sheet_name: Optional[str] = None,
+                            limit: int = 100) -> List[Tuple[str, int, float]]:
+        """Files with matching findings as (path, finding count, last run time)
+
+        Only each file's latest run counts, so a file analyzed many times is
+        not ranked above files that currently have more findings.
+        """
+        where, params = self._filters(since, severity, error_type, sheet_name)
+        return self.conn.execute(
+            "SELECT fl.path, COUNT(*), MAX(r.started_at) FROM findings f "
+            "JOIN runs r ON r.id = f.run_id JOIN files fl ON fl.id = f.file_id"
+            f"{where} GROUP BY f.file_id ORDER BY COUNT(*) DESC LIMIT ?", params + [limit]
+        ).fetchall()
+
+    def recent_runs(self, limit: int = 20) -> List[Tuple[str, float, int, Optional[str], int]]:
+        """Latest runs as (path, started_at, total_errors, coverage_mode, complete)"""
+        return self.conn.execute(
+            "SELECT fl.path, r.started_at, r.total_errors, r.coverage_mode, r.complete "
+            "FROM runs r JOIN files fl ON fl.id = r.file_id "
+            "ORDER BY r.started_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+def export_report_sqlite(report: AnalysisReport, db_path: str, file_path: Optional[str] = None) -> int:
+    """Append a report to a SQLite findings database"""
+    with FindingsDatabase(db_path) as db:
+        return db.record_report(report, file_path)
@@ -0,0 +1,194 @@
+"""Bulk checks of numeric cell values
+
+The worksheet scan collects the raw ``<v>`` text, reference and style of
+numeric cells into a ``NumericBatch``; once a batch is full it is turned
+into a ``NumericColumn``, which parses all values at once and answers
+each check with the indices of the offending cells. With NumPy installed
+parsing and checks are vectorized; without it the same checks run as
+plain Python loops.
+
+Values must be spelled as xsd:double, which is stricter than ``float()``:
+no surrounding whitespace, no ``_`` digit separators and ASCII digits
+only. The special values NaN and INF cannot be stored by Excel and are
+reported as invalid along with everything else that does not match.
+"""
+import math
+import re
+from array import array
+from typing import FrozenSet, List, Optional, Sequence
+
+from ..constants import ExcelLimits
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, see extras_require
+    np = None
+
+# Built-in number formats that display a date or time (ECMA-376 18.8.30,
+# including the East Asian ones)
+BUILTIN_DATE_FORMATS = frozenset(list(range(14, 23)) + list(range(27, 37)) +
+                                 list(range(45, 48)) + list(range(50, 59)))
+
+# Finite xsd:double lexical form (XML Schema Part 2, 3.2.5.1)
+_DOUBLE = r'[+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?'
+_DOUBLE_RE = re.compile(_DOUBLE)
+# Restricted to these characters float() accepts exactly the spellings above
+_DOUBLE_CHARACTERS = b'0123456789+-.eE'
+
+_FORMAT_LITERALS_RE = re.compile(r'"[^"]*"|\\.|\[[^\]]*\]|_.|\*.')
+_DATE_TOKENS_RE = re.compile(r'[dmyhs]', re.IGNORECASE)
+
+# Below this Excel's 15 digits cover every integer digit, so only larger
+# values can lose digits that were written out
+_PRECISION_CHECK_FROM = 10.0 ** ExcelLimits.MAX_NUMBER_PRECISION
+
+def is_date_format(format_code: str) -> bool:
+    """Whether a custom number format code displays a date or time"""
+    # Only the first section counts; quoted text, escapes, colours and
+    # padding do not
+    section = format_code.split(';', 1)[0]
+    return bool(_DATE_TOKENS_RE.search(_FORMAT_LITERALS_RE.sub('', section)))
+
+def _parse(text: str) -> Optional[float]:
+    return float(text) if _DOUBLE_RE.fullmatch(text) else None
+
+def _parse_all(texts: List[str]):
+    """Values of a whole batch as a NumPy array, or None unless all are valid"""
+    joined = ''.join(texts)
+    if not joined.isascii() or joined.encode('ascii').translate(None, _DOUBLE_CHARACTERS):
+        return None
+    try:
+        # float() over the texts runs in C and beats NumPy's string casts
+        return np.fromiter(map(float, texts), np.float64, len(texts))
+    except ValueError:
+        return None
+
+def _style_index(style: str) -> int:
+    """cellXfs index of a cell's ``s`` attribute; absent or malformed is 0"""
+    return int(style) if style.isascii() and style.isdigit() and len(style) < 10 else 0
+
+def _exceeds_precision(text: str) -> bool:
+    """Whether a value is written with more significant digits than Excel keeps
+
+    The digits are counted in the text, since parsing it as a float may
+    already have dropped some of them."""
+    mantissa = text.lstrip('+-').lower().partition('e')[0]
+    return len(mantissa.replace('.', '').strip('0')) > ExcelLimits.MAX_NUMBER_PRECISION
+
+class NumericBatch:
+    """Raw numeric cells collected during a worksheet scan
+
+    Style indices are kept as a typed array, so the date check can view
+    them as a NumPy array without converting cell by cell. ``positions``
+    records for each cell where its findings belong in the caller's list
+    of findings.
+    """
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.refs: List[str] = []
+        self.styles = array('I')
+        self.positions = array('Q')
+
+    def add(self, text: str, ref: str, style: str, position: int = 0):
+        self.texts.append(text)
+        self.refs.append(ref)
+        self.styles.append(_style_index(style))
+        self.positions.append(position)
+
+    def extend(self, cells: Sequence, position: int = 0):
+        """Add the numeric cells (``CellRecord``) of one row"""
+        self.texts.extend([cell.value for cell in cells])
+        self.refs.extend([cell.ref for cell in cells])
+        self.styles.extend([_style_index(cell.style) for cell in cells])
+        self.positions.extend([position] * len(cells))
+
+    def clear(self):
+        self.texts, self.refs, self.styles, self.positions = [], [], array('I'), array('Q')
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+class NumericColumn:
+    """Parsed values of a batch, with vectorized checks over them
+
+    ``date_styles`` are the cell style indices (cellXfs positions, cells
+    without an ``s`` attribute use 0) whose number format displays a date,
+    and ``date1904`` selects the workbook's date system.
+    """
+
+    def __init__(self, batch: NumericBatch, date_styles: FrozenSet[int] = frozenset(),
+                 date1904: bool = False):
+        self.texts = batch.texts
+        self.refs = batch.refs
+        self.styles = batch.styles
+        self.date_styles = date_styles
+        self.date1904 = date1904
+        if np is not None:
+            values = _parse_all(self.texts)
+            if values is not None:
+                self.values = values
+                self.unparsed = np.zeros(len(self.texts), dtype=bool)
+            else:
+                parsed = [_parse(text) for text in self.texts]
+                self.unparsed = np.array([value is None for value in parsed], dtype=bool)
+                self.values = np.array([value if value is not None else np.nan for value in parsed],
+                                       dtype=np.float64)
+        else:
+            self.values = [_parse(text) for text in self.texts]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def invalid(self) -> List[int]:
+        """Indices of values that are not numbers: NaN, INF or garbage"""
+        if np is not None:
+            return np.flatnonzero(self.unparsed).tolist()
+        return [i for i, value in enumerate(self.values) if value is None]
+
+    def out_of_range(self) -> List[int]:
+        """Indices of numbers beyond the range Excel can store"""
+        if np is not None:
+            magnitude = np.abs(self.values)
+            with np.errstate(invalid='ignore'):
+                mask = ((magnitude > ExcelLimits.MAX_NUMBER)
+                        | ((magnitude > 0) & (magnitude < ExcelLimits.MIN_POSITIVE_NUMBER)))
+            return np.flatnonzero(mask).tolist()
+        return [i for i, value in enumerate(self.values)
+                if value is not None
+                and (abs(value) > ExcelLimits.MAX_NUMBER
+                     or 0 < abs(value) < ExcelLimits.MIN_POSITIVE_NUMBER)]
+
+    def imprecise(self) -> List[int]:
+        """Indices of large numbers written with more significant digits than Excel keeps"""
+        if np is not None:
+            magnitude = np.abs(self.values)
+            with np.errstate(invalid='ignore'):
+                mask = (magnitude >= _PRECISION_CHECK_FROM) & (magnitude <= ExcelLimits.MAX_NUMBER)
+            candidates = np.flatnonzero(mask).tolist()
+            return [i for i in candidates if _exceeds_precision(self.texts[i])]
+        return [i for i, value in enumerate(self.values)
+                if value is not None
+                and _PRECISION_CHECK_FROM <= abs(value) <= ExcelLimits.MAX_NUMBER
+                and _exceeds_precision(self.texts[i])]
+
+    @property
+    def max_date_serial(self) -> int:
+        return ExcelLimits.MAX_DATE_SERIAL_1904 if self.date1904 else ExcelLimits.MAX_DATE_SERIAL_1900
+
+    def dates_out_of_range(self) -> List[int]:
+        """Indices of date-formatted values outside the workbook's date system"""
+        if not self.date_styles:
+            return []
+        # Serials up to the end of the last day are still that day
+        limit = self.max_date_serial + 1
+        if np is not None:
+            styles = np.frombuffer(self.styles, dtype=np.uint32)
+            is_date = np.isin(styles, np.fromiter(self.date_styles, np.uint32, len(self.date_styles)))
+            with np.errstate(invalid='ignore'):
+                # NaN and INF are reported as invalid or out of range already
+                mask = is_date & np.isfinite(self.values) & ((self.values < 0) | (self.values >= limit))
+            return np.flatnonzero(mask).tolist()
+        return [i for i, (value, style) in enumerate(zip(self.values, self.styles))
+                if style in self.date_styles and value is not None and math.isfinite(value)
+                and (value < 0 or value >= limit)]
@@ -1,9 +1,18 @@
 """Utilities for generating analysis reports"""
+import glob
+import html
+import itertools
 import json
-from typing import List
-from ..models import CellError, AnalysisReport, ErrorSeverity
+import os
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+from ..models import (CellError, AnalysisReport, ErrorSeverity, ScanCoverage, WorkbookStats, LengthHistogram,
+                      SharedStringHealth)
 
-def generate_report(file_name: str, errors: List[CellError]) -> AnalysisReport:
+def generate_report(file_name: str, errors: List[CellError],
+                    coverage: Optional[ScanCoverage] = None,
+                    stats: Optional[WorkbookStats] = None,
+                    sst_health: Optional[SharedStringHealth] = None) -> AnalysisReport:
     """Generate analysis report from errors"""
     errors_by_severity = {sev: [] for sev in ErrorSeverity}
     errors_by_sheet = {}
@@ -21,7 +30,10 @@ def generate_report(file_name: str, errors: List[CellError]) -> AnalysisReport:
         file_name=file_name,
         total_errors=len(errors),
         errors_by_severity=errors_by_severity,
-        errors_by_sheet=errors_by_sheet
+        errors_by_sheet=errors_by_sheet,
+        coverage=coverage,
+        stats=stats,
+        sst_health=sst_health
     )
 
 def export_report_json(report: AnalysisReport, output_file: str):
@@ -36,17 +48,15 @@ def export_report_html(report: AnalysisReport, output_file: str):
     <html>
     <head>
         <title>Excel Analysis Report - {report.file_name}</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 20px; }}
-            .error {{ color: red; }}
-            .warning {{ color: orange; }}
-            .info {{ color: blue; }}
-        </style>
+        <style>{_REPORT_STYLE}</style>
     </head>
     <body>
         <h1>Excel Analysis Report</h1>
         <h2>File: {report.file_name}</h2>
         <p>Total errors found: {report.total_errors}</p>
+        {_generate_coverage_section(report)}
+        {_generate_stats_section(report)}
+        {_generate_sst_health_section(report)}
         
         <h3>Errors by Severity</h3>
         {_generate_severity_section(report)}
@@ -60,6 +70,383 @@ def export_report_html(report: AnalysisReport, output_file: str):
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(html_content)
 
+_REPORT_STYLE = """
+            body { font-family: Arial, sans-serif; margin: 20px; }
+            .critical { color: darkred; }
+            .error { color: red; }
+            .warning { color: orange; }
+            .info { color: blue; }
+            table { border-collapse: collapse; margin-bottom: 10px; }
+            th, td { border: 1px solid #ccc; padding: 2px 8px; text-align: right; }
+            #findings td { text-align: left; }
+"""
+
+# Findings per data file of a paged HTML report
+HTML_PAGE_SIZE = 1000
+
+def export_report_html_paged(report: AnalysisReport, output_file: str,
+                             page_size: int = HTML_PAGE_SIZE) -> str:
+    """Export report as a small HTML page plus chunked data files
+
+    The page itself only holds the summary; findings are written in
+    ``page_size`` chunks to ``<name>_files/findings-NNNNN.js`` next to it,
+    with an ``index.js`` recording which severities, sheets and error
+    types each chunk contains. The viewer loads one chunk at a time and
+    skips chunks that cannot match the current filter, so the page size
+    and browser memory do not grow with the number of findings. Chunks
+    are script files rather than JSON so the report also works when
+    opened straight from disk. Returns the data directory.
+    """
+    stem = os.path.splitext(os.path.basename(output_file))[0]
+    data_name = f"{stem}_files"
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(output_file)), data_name)
+    os.makedirs(data_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(data_dir, 'findings-*.js')):
+        os.remove(stale)
+    
+    severities = [severity.value for severity in ErrorSeverity]
+    sheets = list(report.errors_by_sheet)
+    sheet_ids = {name: i for i, name in enumerate(sheets)}
+    type_ids: Dict[str, int] = {}
+    fix_ids: Dict[str, int] = {}
+    chunks = []
+    
+    # Most severe first, grouped by sheet, so a filtered view touches few chunks
+    ordered = itertools.chain.from_iterable(
+        sorted(report.errors_by_severity[severity], key=lambda error: sheet_ids[error.sheet_name])
+        for severity in reversed(ErrorSeverity)
+    )
+    for number, batch in enumerate(_batched(ordered, page_size)):
+        rows = []
+        facets = {"severities": {}, "sheets": {}, "types": {}}
+        for error in batch:
+            severity_id = severities.index(error.severity.value)
+            type_id = type_ids.setdefault(error.error_type, len(type_ids))
+            fix_id = fix_ids.setdefault(error.fix_suggestion, len(fix_ids)) if error.fix_suggestion else None
+            rows.append([severity_id, sheet_ids[error.sheet_name], type_id, error.row, error.column,
+                         error.details, fix_id])
+            for facet, key in (("severities", severity_id), ("sheets", sheet_ids[error.sheet_name]),
+                               ("types", type_id)):
+                facets[facet][key] = facets[facet].get(key, 0) + 1
+        file_name = f"findings-{number + 1:05d}.js"
+        _write_script(os.path.join(data_dir, file_name), f"excelReport.loadChunk({number}, ", rows)
+        chunks.append(dict(file=file_name, count=len(rows), **facets))
+    
+    _write_script(os.path.join(data_dir, 'index.js'), "excelReport.loadIndex(", {
+        "severities": severities,
+        "sheets": sheets,
+        "types": list(type_ids),
+        "fixes": list(fix_ids),
+        "chunks": chunks
+    })
+    
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(_paged_html(report, severities, sheets, list(type_ids), quote(data_name)))
+    return data_dir
+
+def _batched(items: Iterable, size: int) -> Iterable[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _write_script(path: str, call: str, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(call)
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        f.write(");\n")
+
+def _count_table(title: str, counts: Dict[str, int]) -> str:
+    rows = ''.join(f"<tr><td>{html.escape(name)}</td><td>{count}</td></tr>"
+                   for name, count in sorted(counts.items(), key=lambda item: -item[1]))
+    return f"<table><tr><th>{title}</th><th>Findings</th></tr>{rows}</table>"
+
+def _options(names: List[str]) -> str:
+    return ''.join(f'<option value="{i}">{html.escape(name)}</option>' for i, name in enumerate(names))
+
+def _paged_html(report: AnalysisReport, severities: List[str], sheets: List[str],
+                types: List[str], data_dir: str) -> str:
+    by_type: Dict[str, int] = {}
+    for errors in report.errors_by_severity.values():
+        for error in errors:
+            by_type[error.error_type] = by_type.get(error.error_type, 0) + 1
+    by_severity = {severity.value: len(errors) for severity, errors in report.errors_by_severity.items() if errors}
+    by_sheet = {sheet: len(errors) for sheet, errors in report.errors_by_sheet.items()}
+    return f"""<!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <title>Excel Analysis Report - {html.escape(report.file_name)}</title>
+        <style>{_REPORT_STYLE}</style>
+    </head>
+    <body data-dir="{data_dir}">
+        <h1>Excel Analysis Report</h1>
+        <h2>File: {html.escape(report.file_name)}</h2>
+        <p>Total errors found: {report.total_errors}</p>
+        {_generate_coverage_section(report)}
+        {_generate_stats_section(report)}
+        {_generate_sst_health_section(report)}
+        
+        <h3>Summary</h3>
+        {_count_table("Severity", by_severity)}
+        {_count_table("Worksheet", by_sheet)}
+        {_count_table("Error type", by_type)}
+        
+        <h3>Findings</h3>
+        <p>
+            <select id="filter-severity"><option value="">All severities</option>{_options(severities)}</select>
+            <select id="filter-sheet"><option value="">All worksheets</option>{_options(sheets)}</select>
+            <select id="filter-type"><option value="">All error types</option>{_options(types)}</select>
+            <button id="prev" disabled>Previous</button>
+            <button id="next" disabled>Next</button>
+            <span id="status">Loading...</span>
+        </p>
+        <table id="findings">
+            <thead><tr><th>Severity</th><th>Worksheet</th><th>Location</th><th>Type</th><th>Details</th><th>Suggestion</th></tr></thead>
+            <tbody id="findings-body"></tbody>
+        </table>
+        <script>{_PAGED_VIEWER_JS}</script>
+        <script src="{data_dir}/index.js"></script>
+    </body>
+    </html>
+    """
+
+# Viewer of the paged report: keeps the index and a single data chunk in
+# memory and collects one page of matching findings at a time
+_PAGED_VIEWER_JS = """
+(function () {
+    var PAGE_SIZE = 100;
+    var FACETS = {severity: 'severities', sheet: 'sheets', type: 'types'};
+    var dataDir = document.body.getAttribute('data-dir');
+    var index = null;
+    var cache = {number: -1, rows: null};
+    var waiting = {};
+    var starts = [{chunk: 0, offset: 0}];
+    var page = 0;
+    var next = null;
+    var generation = 0;
+
+    window.excelReport = {
+        loadIndex: function (data) {
+            index = data;
+            render();
+        },
+        loadChunk: function (number, rows) {
+            var request = waiting[number];
+            if (!request) return;
+            delete waiting[number];
+            document.head.removeChild(request.script);
+            cache = {number: number, rows: rows};
+            request.callbacks.forEach(function (callback) { callback(rows); });
+        }
+    };
+
+    function fetchChunk(number, callback) {
+        if (cache.number === number) {
+            callback(cache.rows);
+            return;
+        }
+        if (waiting[number]) {
+            waiting[number].callbacks.push(callback);
+            return;
+        }
+        var script = document.createElement('script');
+        waiting[number] = {script: script, callbacks: [callback]};
+        script.onerror = function () {
+            // Forget the failed load so the chunk can be requested again
+            delete waiting[number];
+            document.head.removeChild(script);
+            setStatus('Could not load ' + script.src);
+        };
+        script.src = dataDir + '/' + index.chunks[number].file;
+        document.head.appendChild(script);
+    }
+
+    function currentFilter() {
+        var filter = {};
+        Object.keys(FACETS).forEach(function (key) {
+            var value = document.getElementById('filter-' + key).value;
+            filter[key] = value === '' ? null : Number(value);
+        });
+        return filter;
+    }
+
+    function chunkMatches(chunk, filter) {
+        return Object.keys(FACETS).every(function (key) {
+            return filter[key] === null || chunk[FACETS[key]][filter[key]];
+        });
+    }
+
+    function rowMatches(row, filter) {
+        return (filter.severity === null || row[0] === filter.severity) &&
+               (filter.sheet === null || row[1] === filter.sheet) &&
+               (filter.type === null || row[2] === filter.type);
+    }
+
+    // Exact number of matches when at most one filter is set, else null
+    function matchCount(filter) {
+        var active = Object.keys(FACETS).filter(function (key) { return filter[key] !== null; });
+        if (active.length > 1) return null;
+        return index.chunks.reduce(function (total, chunk) {
+            if (!active.length) return total + chunk.count;
+            return total + (chunk[FACETS[active[0]]][filter[active[0]]] || 0);
+        }, 0);
+    }
+
+    function collect(cursor, filter, found, token, done) {
+        var number = cursor.chunk;
+        var offset = cursor.offset;
+        while (number < index.chunks.length && !chunkMatches(index.chunks[number], filter)) {
+            number++;
+            offset = 0;
+        }
+        if (number >= index.chunks.length) {
+            done(found, null);
+            return;
+        }
+        fetchChunk(number, function (rows) {
+            if (token !== generation) return;
+            for (var i = offset; i < rows.length; i++) {
+                if (!rowMatches(rows[i], filter)) continue;
+                if (found.length === PAGE_SIZE) {
+                    done(found, {chunk: number, offset: i});
+                    return;
+                }
+                found.push(rows[i]);
+            }
+            collect({chunk: number + 1, offset: 0}, filter, found, token, done);
+        });
+    }
+
+    function renderRow(row) {
+        var tr = document.createElement('tr');
+        tr.className = index.severities[row[0]];
+        var location = row[4] ? row[4] + row[3] : 'Sheet level';
+        var cells = [index.severities[row[0]], index.sheets[row[1]], location,
+                     index.types[row[2]], row[5], row[6] === null ? '' : index.fixes[row[6]]];
+        cells.forEach(function (text) {
+            var td = document.createElement('td');
+            td.textContent = text;
+            tr.appendChild(td);
+        });
+        return tr;
+    }
+
+    function setStatus(text) {
+        document.getElementById('status').textContent = text;
+    }
+
+    function render() {
+        var filter = currentFilter();
+        var token = ++generation;
+        setStatus('Loading...');
+        collect(starts[page], filter, [], token, function (rows, cursor) {
+            if (token !== generation) return;
+            next = cursor;
+            var body = document.getElementById('findings-body');
+            body.textContent = '';
+            rows.forEach(function (row) { body.appendChild(renderRow(row)); });
+            document.getElementById('prev').disabled = page === 0;
+            document.getElementById('next').disabled = cursor === null;
+            var total = matchCount(filter);
+            var pages = total === null ? '' : ' of ' + Math.max(1, Math.ceil(total / PAGE_SIZE));
+            setStatus('Page ' + (page + 1) + pages + (total === null ? '' : ' (' + total + ' findings)'));
+        });
+    }
+
+    Object.keys(FACETS).forEach(function (key) {
+        document.getElementById('filter-' + key).onchange = function () {
+            starts = [{chunk: 0, offset: 0}];
+            page = 0;
+            render();
+        };
+    });
+    document.getElementById('next').onclick = function () {
+        starts[page + 1] = next;
+        page++;
+        render();
+    };
+    document.getElementById('prev').onclick = function () {
+        page--;
+        render();
+    };
+})();
+"""
+
+def _generate_coverage_section(report: AnalysisReport) -> str:
+    coverage = report.coverage
+    if coverage is None or coverage.complete:
+        return ""
+    skipped = html.escape(', '.join(coverage.skipped_sheets)) or "none"
+    failed = (f"<p>Sheets that failed to parse: {html.escape(', '.join(coverage.failed_sheets))}</p>"
+              if coverage.failed_sheets else "")
+    return f"""
+        <div class="warning">
+            <h3>Partial Scan ({coverage.mode})</h3>
+            <p>Sheets scanned: {coverage.sheets_scanned} of {coverage.sheets_total} (skipped: {skipped})</p>
+            {failed}
+            <p>Rows scanned: {coverage.rows_scanned} of ~{coverage.rows_total} ({coverage.row_coverage:.1%})</p>
+            <p>Estimated remaining errors: {coverage.estimated_remaining_errors:.0f} ({coverage.error_rate:.4f} per row)</p>
+        </div>
+        """
+
+def _generate_stats_section(report: AnalysisReport) -> str:
+    stats = report.stats
+    if stats is None:
+        return ""
+    ratio = stats.unique_to_referenced_ratio
+    ratio_text = f"{ratio:.3f}" if ratio is not None else "n/a"
+    sheet_rows = ''.join(
+        f"<tr><td>{html.escape(name)}</td><td>{sheet.used_range or ''}</td><td>{sheet.rows}</td>"
+        f"<td>{sheet.cells}</td><td>{sheet.formulas}</td>"
+        f"<td>{html.escape(', '.join(f'{t}: {n}' for t, n in sorted(sheet.cells_by_type.items())))}</td></tr>"
+        for name, sheet in stats.sheets.items()
+    )
+    part_rows = ''.join(
+        f"<tr><td>{html.escape(name)}</td><td>{part.compressed_size}</td><td>{part.uncompressed_size}</td>"
+        f"<td>{part.compression_ratio:.1f}</td></tr>"
+        for name, part in sorted(stats.parts.items(), key=lambda item: -item[1].uncompressed_size)
+    )
+    return f"""
+        <h3>Workbook Statistics</h3>
+        <p>Shared strings: {stats.shared_strings} entries, {stats.shared_string_references} references
+           (unique/referenced ratio {ratio_text})</p>
+        <h4>Shared string lengths</h4>
+        {_format_histogram(stats.shared_string_lengths)}
+        <h4>Worksheets</h4>
+        <table>
+            <tr><th>Sheet</th><th>Used range</th><th>Rows</th><th>Cells</th><th>Formulas</th><th>Cells by type</th></tr>
+            {sheet_rows}
+        </table>
+        <h4>Parts</h4>
+        <table>
+            <tr><th>Part</th><th>Compressed</th><th>Uncompressed</th><th>Ratio</th></tr>
+            {part_rows}
+        </table>
+        """
+
+def _generate_sst_health_section(report: AnalysisReport) -> str:
+    health = report.sst_health
+    if health is None or not health.entries:
+        return ""
+    unreferenced = health.unreferenced if health.unreferenced is not None else "not checked (partial scan)"
+    return f"""
+        <h3>Shared Strings Table</h3>
+        <p>Entries: {health.entries} (uniqueCount {health.declared_unique}),
+           references: {health.references} (count {health.declared_count})</p>
+        <p>Duplicates: {health.duplicates}, unreferenced: {unreferenced},
+           about {health.reclaimable_bytes} bytes reclaimable</p>
+        """
+
+def _format_histogram(histogram: LengthHistogram) -> str:
+    cells = ''.join(
+        f"<tr><td>{LengthHistogram.bucket_label(i)}</td><td>{n}</td></tr>"
+        for i, n in enumerate(histogram.counts) if n
+    )
+    return f"<table><tr><th>Length</th><th>Strings</th></tr>{cells}</table>"
+
 def _generate_severity_section(report: AnalysisReport) -> str:
     sections = []
     for severity in ErrorSeverity:
@@ -91,4 +478,38 @@ def _generate_sheet_section(report: AnalysisReport) -> str:
 def _format_error(error: CellError) -> str:
     location = f"Cell {error.column}{error.row}" if error.column else "Sheet level"
     fix = f"<br>Suggestion: {error.fix_suggestion}" if error.fix_suggestion else ""
-    return f"{location} - {error.error_type}: {error.details}{fix}" 
\ No newline at end of file
+    return f"{location} - {error.error_type}: {error.details}{fix}" 
+
+class ReportSink:
+    """Destination for reports produced by unattended runs (watch, batch)
+
+    Reports are written as ``<file name>.json`` / ``<file name>.html`` into
+    the configured directories and/or appended to a findings database.
+    """
+
+    def __init__(self, json_dir: Optional[str] = None, html_dir: Optional[str] = None,
+                 db_path: Optional[str] = None, html_paged: bool = False):
+        self.json_dir = json_dir
+        self.html_dir = html_dir
+        self.html_paged = html_paged
+        self.db = None
+        for directory in (json_dir, html_dir):
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        if db_path:
+            from .db_utils import FindingsDatabase
+            self.db = FindingsDatabase(db_path)
+
+    def write(self, report: AnalysisReport, file_path: Optional[str] = None):
+        if self.json_dir:
+            export_report_json(report, os.path.join(self.json_dir, f"{report.file_name}.json"))
+        if self.html_dir:
+            export = export_report_html_paged if self.html_paged else export_report_html
+            export(report, os.path.join(self.html_dir, f"{report.file_name}.html"))
+        if self.db is not None:
+            self.db.record_report(report, file_path)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
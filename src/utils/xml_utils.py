@@ -1,6 +1,26 @@
-"""XML parsing utilities"""
+"""XML parsing utilities
+
+Worksheets and the shared strings table are read through a parser
+backend. All backends produce the same lightweight records, so the
+analyzer does not depend on which parser is installed:
+
+- stdlib: xml.etree.ElementTree.iterparse (always available)
+- lxml: lxml.etree.iterparse (used when lxml is installed)
+- expat: raw xml.parsers.expat events, no element objects at all
+
+``get_backend()`` returns the fastest installed backend.
+
+``find_sheet_data`` and ``split_row_ranges`` cut a decompressed worksheet
+into row-aligned byte ranges that can be parsed independently; each range
+is fed to a backend between the worksheet's head and tail through a
+``SegmentReader``. ``RowSampleReader`` uses the same row boundaries to
+drop unsampled blocks of rows before they are parsed.
+"""
+import re
+from abc import ABC, abstractmethod
 import xml.etree.ElementTree as ET
-from typing import Optional, Dict, List, Tuple
+from xml.parsers import expat
+from typing import IO, Callable, Iterator, NamedTuple, Optional, Dict, List, Tuple
 from ..constants import XMLNamespaces
 
 def find_elements(root: ET.Element, path: str, namespace: str = XMLNamespaces.MAIN) -> List[ET.Element]:
@@ -13,7 +33,614 @@ def get_attribute(element: ET.Element, attr: str, default: str = '') -> str:
     return element.get(attr, default)
 
 def parse_cell_reference(cell_ref: str) -> Tuple[str, int]:
-    """Parse cell reference into column and row"""
+    """Parse cell reference into column and row; row 0 when it has no row number"""
     col = ''.join(c for c in cell_ref if c.isalpha())
-    row = int(''.join(c for c in cell_ref if c.isdigit()))
-    return col, row 
\ No newline at end of file
+    digits = ''.join(c for c in cell_ref if c.isdigit())
+    return col, int(digits) if digits else 0
+
+_DIMENSION_RE = re.compile(rb'<(?:\w+:)?dimension\s+ref="([^"]+)"')
+
+def read_dimension(head: bytes) -> Optional[str]:
+    """Extract the <dimension ref> from the first bytes of a worksheet"""
+    match = _DIMENSION_RE.search(head)
+    return match.group(1).decode('ascii', 'replace') if match else None
+
+_SHEET_DATA_OPEN_RE = re.compile(rb'<(?:\w+:)?sheetData(?:\s[^>]*?)?\s*(/?)>')
+_SHEET_DATA_CLOSE_RE = re.compile(rb'</(?:\w+:)?sheetData\s*>')
+_ROW_START_RE = re.compile(rb'<(?:\w+:)?row[\s/>]')
+
+def find_sheet_data(data, tail_window: int = 1 << 20) -> Optional[Tuple[int, int]]:
+    """Byte range of the content of <sheetData> in a worksheet buffer
+
+    ``data`` is any bytes-like object (bytes, mmap, memoryview). Returns
+    None when the worksheet has no or an empty <sheetData>. The closing
+    tag is searched backwards from the end in growing windows, since only
+    a few small elements follow it.
+    """
+    match = _SHEET_DATA_OPEN_RE.search(data)
+    if match is None or match.group(1):
+        return None
+    start = match.end()
+    window = tail_window
+    while True:
+        low = max(start, len(data) - window)
+        close = None
+        for close in _SHEET_DATA_CLOSE_RE.finditer(data, low):
+            pass
+        if close is not None:
+            return start, close.start()
+        if low == start:
+            return None
+        window *= 4
+
+def split_row_ranges(data, start: int, end: int, parts: int) -> List[Tuple[int, int]]:
+    """Split ``data[start:end]`` into up to ``parts`` ranges at <row> tags
+
+    Ranges are of roughly equal size and each one begins at a row's start
+    tag, so every range holds whole rows. A literal '<' cannot occur in
+    text or attribute values, so a '<row' match is always a real tag (the
+    worksheet parts Excel writes contain no comments or CDATA sections).
+    """
+    bounds = [start]
+    step = max((end - start) // max(parts, 1), 1)
+    for i in range(1, parts):
+        target = max(start + i * step, bounds[-1] + 1)
+        if target >= end:
+            break
+        match = _ROW_START_RE.search(data, target, end)
+        if match is None:
+            break
+        bounds.append(match.start())
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+class SegmentReader:
+    """Read-only binary stream over several buffers, without joining them
+
+    Used to parse a row range of a shared buffer as a complete document
+    (head + rows + tail) without copying the range first.
+    """
+
+    def __init__(self, *segments):
+        self._segments = [memoryview(segment) for segment in segments]
+        self._index = 0
+        self._offset = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(1 << 20), b''))
+        while self._index < len(self._segments):
+            segment = self._segments[self._index]
+            if self._offset < len(segment):
+                end = min(len(segment), self._offset + size)
+                data = segment[self._offset:end].tobytes()
+                self._offset = end
+                return data
+            self._index += 1
+            self._offset = 0
+        return b''
+
+    def close(self):
+        """Release the views so the underlying buffers can be closed"""
+        for segment in self._segments:
+            segment.release()
+        self._segments = []
+
+    def __enter__(self) -> 'SegmentReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class RowSampleReader:
+    """Binary stream over a worksheet that keeps only a sample of its rows
+
+    The raw bytes are cut into blocks of ``block_rows`` whole rows at <row>
+    tags (see ``split_row_ranges``) and ``keep()`` is asked once per block.
+    Rejected blocks are dropped before they reach the XML parser, so a
+    sampled scan only pays for parsing the rows it checks. The kept blocks
+    still form a well-formed worksheet with the original head and tail.
+    ``rows_total`` counts the rows of every block read so far.
+    """
+    READ_SIZE = 1 << 16
+
+    def __init__(self, source: IO[bytes], keep: Callable[[], bool], block_rows: int = 8):
+        self._source = source
+        self._keep = keep
+        self._block_rows = block_rows
+        self._carry = b''
+        self._out = bytearray()
+        self._state = 'head'
+        self._eof = False
+        self.rows_total = 0
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size is None or size < 0 or len(self._out) < size):
+            self._fill()
+        if size is None or size < 0:
+            size = len(self._out)
+        data = bytes(self._out[:size])
+        del self._out[:size]
+        return data
+
+    def _fill(self):
+        chunk = self._source.read(self.READ_SIZE)
+        if self._state == 'tail':
+            self._out += chunk
+            self._eof = not chunk
+            return
+        data = self._carry + chunk
+        self._carry = b''
+        if self._state == 'head':
+            match = _SHEET_DATA_OPEN_RE.search(data)
+            if match is None:
+                if chunk:
+                    self._carry = data
+                else:
+                    # No <sheetData>; leave it to the parser
+                    self._out += data
+                    self._eof = True
+                return
+            self._out += data[:match.end()]
+            data = data[match.end():]
+            self._state = 'tail' if match.group(1) else 'rows'
+            if self._state == 'tail':
+                self._out += data
+                self._eof = not chunk
+                return
+        close = _SHEET_DATA_CLOSE_RE.search(data)
+        if close is not None:
+            self._take_rows(data[:close.start()], final=True)
+            self._out += data[close.start():]
+            self._state = 'tail'
+            self._eof = not chunk
+        elif not chunk:
+            # Truncated worksheet; the parser reports it
+            self._take_rows(data, final=True)
+            self._eof = True
+        else:
+            self._carry = self._take_rows(data, final=False)
+
+    def _take_rows(self, data: bytes, final: bool) -> bytes:
+        """Sample the complete blocks of ``data`` and return the rest"""
+        starts = [match.start() for match in _ROW_START_RE.finditer(data)]
+        # A row is only known to be complete once the next one has started
+        cut, i = 0, self._block_rows
+        while i < len(starts):
+            self._take_block(data[cut:starts[i]], self._block_rows)
+            cut = starts[i]
+            i += self._block_rows
+        if not final:
+            return data[cut:]
+        rows = len(starts) - (i - self._block_rows)
+        if rows:
+            self._take_block(data[cut:], rows)
+        return b''
+
+    def _take_block(self, block: bytes, rows: int):
+        self.rows_total += rows
+        if self._keep():
+            self._out += block
+
+    def close(self):
+        self._out = bytearray()
+
+def range_row_count(ref: str) -> int:
+    """Number of rows spanned by a range reference such as 'A1:C100'"""
+    parts = ref.split(':')
+    rows = []
+    for part in parts:
+        digits = ''.join(c for c in part if c.isdigit())
+        if digits:
+            rows.append(int(digits))
+    if not rows:
+        return 0
+    return max(rows) - min(rows) + 1
+
+def column_index(column: str) -> int:
+    """Convert column letters to a 1-based index ('A' -> 1, 'AA' -> 27)"""
+    index = 0
+    for c in column.upper():
+        index = index * 26 + (ord(c) - 64)
+    return index
+
+def column_letter(index: int) -> str:
+    """Convert a 1-based column index to letters (27 -> 'AA')"""
+    letters = ''
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+class CellRecord(NamedTuple):
+    """The parts of a <c> element the analyzer looks at"""
+    ref: str
+    type: str
+    value: Optional[str]
+    inline_text: Optional[str]
+    has_formula: bool
+    style: str = ''
+
+class RowRecord(NamedTuple):
+    """A <row> element and its cells"""
+    number: Optional[int]
+    cells: List[CellRecord]
+
+def resolve_cell_references(row: RowRecord) -> RowRecord:
+    """Fill in the reference of cells without an ``r`` attribute
+
+    Such a cell is in the column after the previous cell of its row. Its
+    row number is the row's own, and left out when the row has none.
+    """
+    if all(cell.ref for cell in row.cells):
+        return row
+    suffix = '' if row.number is None else str(row.number)
+    cells = []
+    column = 0
+    for cell in row.cells:
+        if cell.ref:
+            column = column_index(cell.ref.rstrip('0123456789'))
+        else:
+            column += 1
+            cell = cell._replace(ref=f'{column_letter(column)}{suffix}')
+        cells.append(cell)
+    return RowRecord(row.number, cells)
+
+class SharedStringRecord(NamedTuple):
+    """An <si> entry: its first <t> and all of its text runs joined
+
+    ``full_text`` leaves out phonetic runs (<rPh>); both are None when the
+    entry holds no text. ``formatting`` describes the rich text runs (<r>)
+    by their length and run properties (<rPr>), and is None for plain
+    entries, so equal text with different formatting can be told apart."""
+    text: Optional[str]
+    full_text: Optional[str]
+    formatting: Optional[str] = None
+
+def _run_property(tag: str, attrs: Dict[str, str]) -> str:
+    """Backend independent spelling of one <rPr> child, e.g. ``sz[val=11]``"""
+    return '%s[%s]' % (tag.rpartition('}')[2], ','.join(f'{k}={v}' for k, v in sorted(attrs.items())))
+
+def _run_formatting(length: int, properties: List[str]) -> str:
+    return f"{length}:{''.join(properties)}"
+
+class ParserBackend(ABC):
+    """Interface of an XML parser backend
+
+    ``iter_rows`` streams the rows of a worksheet and
+    ``iter_shared_string_records`` the entries of the shared strings
+    table; ``iter_shared_strings`` yields just the text of the first <t>
+    of every <si> (None when it has none). Malformed XML is reported as
+    ``ET.ParseError`` by every backend.
+    """
+    name = 'base'
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def fromstring(self, data: bytes) -> ET.Element:
+        """Parse a small part such as workbook.xml into an element tree"""
+        return ET.fromstring(data)
+
+    @abstractmethod
+    def iter_rows(self, source: IO[bytes], namespace: str = XMLNamespaces.MAIN) -> Iterator[RowRecord]:
+        """Stream the rows of a worksheet"""
+
+    def iter_shared_strings(self, source: IO[bytes], attributes: Optional[Dict[str, str]] = None,
+                            namespace: str = XMLNamespaces.MAIN) -> Iterator[Optional[str]]:
+        for record in self.iter_shared_string_records(source, attributes, namespace):
+            yield record.text
+
+    @abstractmethod
+    def iter_shared_string_records(self, source: IO[bytes], attributes: Optional[Dict[str, str]] = None,
+                                   namespace: str = XMLNamespaces.MAIN) -> Iterator[SharedStringRecord]:
+        """Stream the entries of the shared strings table"""
+
+class ElementTreeBackend(ParserBackend):
+    """Streaming backend on top of xml.etree.ElementTree.iterparse"""
+    name = 'stdlib'
+
+    def _iter_items(self, source: IO[bytes], container_tag: str, item_tag: str,
+                    attributes: Optional[Dict[str, str]] = None) -> Iterator[ET.Element]:
+        """Yield every ``item_tag`` element
+
+        The container is tracked through start events and emptied after
+        each item, so memory stays bounded by a single item however many
+        items there are; merely clearing an item would leave an empty
+        element per item attached to the container. The container's
+        attributes are copied into ``attributes`` if given.
+        """
+        container = None
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == container_tag:
+                    container = elem
+                    if attributes is not None:
+                        attributes.update(elem.attrib)
+            elif elem.tag == item_tag:
+                yield elem
+                if container is not None:
+                    container.clear()
+
+    def _iter_row_elements(self, source: IO[bytes], namespace: str) -> Iterator[ET.Element]:
+        return self._iter_items(source, f'{{{namespace}}}sheetData', f'{{{namespace}}}row')
+
+    def iter_rows(self, source: IO[bytes], namespace: str = XMLNamespaces.MAIN) -> Iterator[RowRecord]:
+        value_tag = f'{{{namespace}}}v'
+        formula_tag = f'{{{namespace}}}f'
+        inline_tag = f'{{{namespace}}}is'
+        text_path = f'.//{{{namespace}}}t'
+        cell_tag = f'{{{namespace}}}c'
+        for row in self._iter_row_elements(source, namespace):
+            cells = []
+            for cell in row:
+                if cell.tag != cell_tag:
+                    continue
+                value = inline_text = None
+                has_formula = False
+                for child in cell:
+                    tag = child.tag
+                    if tag == value_tag:
+                        value = child.text
+                    elif tag == formula_tag:
+                        has_formula = True
+                    elif tag == inline_tag:
+                        t_elem = child.find(text_path)
+                        if t_elem is not None:
+                            inline_text = t_elem.text
+                cells.append(CellRecord(cell.get('r', ''), cell.get('t', ''),
+                                        value, inline_text, has_formula, cell.get('s', '')))
+            number = row.get('r')
+            yield RowRecord(int(number) if number and number.isdigit() else None, cells)
+
+    def iter_shared_string_records(self, source: IO[bytes], attributes: Optional[Dict[str, str]] = None,
+                                   namespace: str = XMLNamespaces.MAIN) -> Iterator[SharedStringRecord]:
+        text_tag, run_tag = f'{{{namespace}}}t', f'{{{namespace}}}r'
+        properties_tag = f'{{{namespace}}}rPr'
+        for si in self._iter_shared_string_elements(source, namespace, attributes):
+            runs = []
+            formatting = []
+            for child in si:
+                if child.tag == text_tag:
+                    runs.append(child)
+                elif child.tag == run_tag:
+                    texts = [t for t in child if t.tag == text_tag]
+                    runs.extend(texts)
+                    properties = child.find(properties_tag)
+                    formatting.append(_run_formatting(
+                        sum(len(t.text or '') for t in texts),
+                        [_run_property(p.tag, p.attrib) for p in properties] if properties is not None else []))
+            formatting = '|'.join(formatting) if formatting else None
+            if len(runs) == 1:
+                text = runs[0].text
+                yield SharedStringRecord(text, text, formatting)
+            elif runs:
+                yield SharedStringRecord(runs[0].text, ''.join(t.text or '' for t in runs) or None, formatting)
+            else:
+                yield SharedStringRecord(None, None, formatting)
+
+    def _iter_shared_string_elements(self, source: IO[bytes], namespace: str,
+                                     attributes: Optional[Dict[str, str]]) -> Iterator[ET.Element]:
+        return self._iter_items(source, f'{{{namespace}}}sst', f'{{{namespace}}}si', attributes)
+
+class LxmlBackend(ElementTreeBackend):
+    """Same record model as the stdlib backend, parsed by lxml
+
+    lxml can filter events by tag in C, so Python only sees one event per
+    row (or <si>) and already-processed siblings are deleted as we go.
+    """
+    name = 'lxml'
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import lxml.etree  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def fromstring(self, data: bytes):
+        from lxml import etree
+        parser = etree.XMLParser(resolve_entities=False, huge_tree=True)
+        return etree.fromstring(data, parser)
+
+    def _iter_tag(self, source: IO[bytes], tag: str, container_tag: Optional[str] = None,
+                  attributes: Optional[Dict[str, str]] = None):
+        from lxml import etree
+        events = ('end',)
+        tags = [tag]
+        if attributes is not None and container_tag is not None:
+            events = ('start', 'end')
+            tags.append(container_tag)
+        try:
+            for event, elem in etree.iterparse(source, events=events, tag=tags,
+                                               huge_tree=True, resolve_entities=False,
+                                               remove_comments=True, remove_pis=True):
+                if event == 'start' or elem.tag != tag:
+                    if event == 'start' and elem.tag == container_tag:
+                        attributes.update(elem.attrib)
+                    continue
+                yield elem
+                elem.clear()
+                parent = elem.getparent()
+                while elem.getprevious() is not None:
+                    del parent[0]
+        except etree.XMLSyntaxError as e:
+            raise ET.ParseError(str(e)) from e
+
+    def _iter_row_elements(self, source: IO[bytes], namespace: str):
+        return self._iter_tag(source, f'{{{namespace}}}row')
+
+    def _iter_shared_string_elements(self, source: IO[bytes], namespace: str,
+                                     attributes: Optional[Dict[str, str]]):
+        return self._iter_tag(source, f'{{{namespace}}}si', f'{{{namespace}}}sst', attributes)
+
+class ExpatBackend(ParserBackend):
+    """Raw expat event backend for the hot cell loop
+
+    Only the handful of values the analyzer needs are captured from parser
+    callbacks; no element objects are built.
+    """
+    name = 'expat'
+    CHUNK_SIZE = 1 << 16
+
+    @staticmethod
+    def _create_parser(start, end, data):
+        parser = expat.ParserCreate(namespace_separator='}')
+        parser.buffer_text = True
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = data
+        return parser
+
+    def _run(self, source: IO[bytes], parser, pending: list) -> Iterator:
+        try:
+            while True:
+                chunk = source.read(self.CHUNK_SIZE)
+                parser.Parse(chunk, not chunk)
+                if pending:
+                    yield from pending
+                    pending.clear()
+                if not chunk:
+                    break
+        except expat.ExpatError as e:
+            raise ET.ParseError(str(e)) from e
+
+    def iter_rows(self, source: IO[bytes], namespace: str = XMLNamespaces.MAIN) -> Iterator[RowRecord]:
+        row_tag, cell_tag = f'{namespace}}}row', f'{namespace}}}c'
+        value_tag, formula_tag = f'{namespace}}}v', f'{namespace}}}f'
+        inline_tag, text_tag = f'{namespace}}}is', f'{namespace}}}t'
+        pending = []
+        buffer = []
+        row_number = cells = None
+        ref = cell_type = style = value = inline_text = None
+        has_formula = in_inline = False
+        capture = None
+
+        def start(name, attrs):
+            nonlocal row_number, cells, ref, cell_type, style, value, inline_text, has_formula, in_inline, capture
+            if name == cell_tag:
+                ref = attrs.get('r', '')
+                cell_type = attrs.get('t', '')
+                style = attrs.get('s', '')
+                value = inline_text = None
+                has_formula = False
+            elif name == value_tag:
+                capture = value_tag
+                buffer.clear()
+            elif name == formula_tag:
+                has_formula = True
+            elif name == inline_tag:
+                in_inline = True
+            elif name == text_tag and in_inline and inline_text is None and capture is None:
+                capture = text_tag
+                buffer.clear()
+            elif name == row_tag:
+                number = attrs.get('r')
+                row_number = int(number) if number and number.isdigit() else None
+                cells = []
+
+        def end(name):
+            nonlocal value, inline_text, in_inline, capture
+            if name == capture:
+                if name == value_tag:
+                    value = ''.join(buffer) or None
+                else:
+                    inline_text = ''.join(buffer) or None
+                capture = None
+            elif name == cell_tag:
+                cells.append(CellRecord(ref, cell_type, value, inline_text, has_formula, style))
+            elif name == inline_tag:
+                in_inline = False
+            elif name == row_tag:
+                pending.append(RowRecord(row_number, cells))
+
+        def data(text):
+            if capture is not None:
+                buffer.append(text)
+
+        return self._run(source, self._create_parser(start, end, data), pending)
+
+    def iter_shared_string_records(self, source: IO[bytes], attributes: Optional[Dict[str, str]] = None,
+                                   namespace: str = XMLNamespaces.MAIN) -> Iterator[SharedStringRecord]:
+        sst_tag, si_tag, text_tag = f'{namespace}}}sst', f'{namespace}}}si', f'{namespace}}}t'
+        phonetic_tag = f'{namespace}}}rPh'
+        run_tag, properties_tag = f'{namespace}}}r', f'{namespace}}}rPr'
+        pending = []
+        buffer = []
+        runs = []
+        formatting = []
+        properties = []
+        run_start = 0
+        capture = in_phonetic = in_properties = False
+
+        def start(name, attrs):
+            nonlocal capture, in_phonetic, in_properties, run_start
+            if in_properties:
+                properties.append(_run_property(name, attrs))
+            elif name == si_tag:
+                runs.clear()
+                formatting.clear()
+            elif name == text_tag and not in_phonetic:
+                capture = True
+                buffer.clear()
+            elif name == run_tag:
+                properties.clear()
+                run_start = len(runs)
+            elif name == properties_tag:
+                in_properties = True
+            elif name == phonetic_tag:
+                in_phonetic = True
+            elif name == sst_tag and attributes is not None:
+                attributes.update(attrs)
+
+        def end(name):
+            nonlocal capture, in_phonetic, in_properties
+            if name == text_tag and capture:
+                runs.append(''.join(buffer))
+                capture = False
+            elif name == properties_tag:
+                in_properties = False
+            elif name == run_tag:
+                formatting.append(_run_formatting(sum(map(len, runs[run_start:])), properties))
+            elif name == phonetic_tag:
+                in_phonetic = False
+            elif name == si_tag:
+                text = runs[0] or None if runs else None
+                full_text = text if len(runs) == 1 else ''.join(runs) or None
+                pending.append(SharedStringRecord(text, full_text, '|'.join(formatting) if formatting else None))
+
+        def data(chunk):
+            if capture:
+                buffer.append(chunk)
+
+        return self._run(source, self._create_parser(start, end, data), pending)
+
+BACKENDS: Dict[str, Callable[[], ParserBackend]] = {
+    'stdlib': ElementTreeBackend,
+    'lxml': LxmlBackend,
+    'expat': ExpatBackend,
+}
+
+# Fastest first as measured on large worksheets and shared strings tables;
+# 'auto' picks the first one that is installed. lxml only beats the stdlib
+# parser when few elements are touched from Python, so raw expat events
+# come first.
+BACKEND_PREFERENCE = ('expat', 'lxml', 'stdlib')
+
+def available_backends() -> List[str]:
+    """Names of the parser backends usable in this environment"""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+def get_backend(name: Optional[str] = None) -> ParserBackend:
+    """Return a parser backend by name, or the fastest installed one"""
+    if name in (None, 'auto'):
+        name = next(n for n in BACKEND_PREFERENCE if BACKENDS[n].available())
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}. "
+                         f"Available backends: {', '.join(available_backends())}")
+    backend = BACKENDS[name]
+    if not backend.available():
+        raise ValueError(f"Parser backend '{name}' is not installed")
+    return backend()
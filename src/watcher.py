@@ -0,0 +1,289 @@
+"""Watch mode for upload drop directories
+
+New or modified workbooks in a directory are picked up, debounced until
+the writer has finished, analyzed on a bounded worker pool and written
+to a report sink. Change notifications come from inotify on Linux and
+from periodic directory scans elsewhere.
+
+A file is considered complete once its size and mtime have not changed
+for ``settle`` seconds and its zip central directory can be read. Files
+are fingerprinted by size, mtime and the CRCs of their parts; a file is
+only analyzed again when its fingerprint changes.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import signal
+import struct
+import sys
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from zipfile import ZipFile, BadZipFile
+
+from .analyzer import analyze_to_report
+from .utils.report_utils import ReportSink
+
+logger = logging.getLogger(__name__)
+
+WATCHED_EXTENSIONS = ('.xlsx', '.xlsm')
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    """Identity of a workbook's content"""
+    size: int
+    mtime: float
+    crcs: Tuple[Tuple[str, int], ...]
+
+    def same_content(self, other: Optional['FileFingerprint']) -> bool:
+        """Whether ``other`` has the same size and part CRCs"""
+        return other is not None and self.size == other.size and self.crcs == other.crcs
+
+def read_fingerprint(path: str) -> Optional[FileFingerprint]:
+    """Fingerprint a workbook from its central directory, None if incomplete"""
+    try:
+        info = os.stat(path)
+        with ZipFile(path) as zf:
+            crcs = tuple(sorted((item.filename, item.CRC) for item in zf.infolist()))
+    except (OSError, BadZipFile):
+        return None
+    return FileFingerprint(info.st_size, info.st_mtime, crcs)
+
+class _Inotify:
+    """Minimal inotify binding through ctypes (Linux only)"""
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+            return hasattr(libc, 'inotify_init1')
+        except OSError:
+            return False
+
+    def read(self, timeout: float) -> Optional[Set[str]]:
+        """Names of entries changed within ``timeout`` seconds
+
+        None when the kernel's event queue overflowed, so changes were lost.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+        names = set()
+        overflowed = False
+        offset = 0
+        header_size = self.EVENT_HEADER.size
+        while offset + header_size <= len(data):
+            _, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += header_size
+            overflowed = overflowed or bool(mask & self.IN_Q_OVERFLOW)
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return None if overflowed else names
+
+    def close(self):
+        os.close(self.fd)
+
+def _ignore_interrupts():
+    """Worker initializer: leave Ctrl+C handling to the watching process"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+@dataclass
+class _Pending:
+    size: int
+    mtime: float
+    changed_at: float
+    first_seen: float
+
+class DirectoryWatcher:
+    """Debounced, incremental analysis of a drop directory"""
+
+    def __init__(self, directory: str, sink: ReportSink, workers: int = 2,
+                 settle: float = 2.0, interval: float = 1.0, max_wait: float = 300.0,
+                 use_inotify: Optional[bool] = None, analyze_options: Optional[dict] = None,
+                 executor: Optional[Executor] = None):
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"Directory does not exist: {directory}")
+        self.directory = directory
+        self.sink = sink
+        self.workers = workers
+        self.settle = settle
+        self.interval = interval
+        self.max_wait = max_wait
+        self.analyze_options = analyze_options or {}
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers,
+                                                        initializer=_ignore_interrupts)
+        self.pending: Dict[str, _Pending] = {}
+        self.analyzed: Dict[str, FileFingerprint] = {}
+        self.in_flight: Dict[Future, Tuple[str, FileFingerprint]] = {}
+        self.analyzed_count = 0
+        self.skipped_count = 0
+        self.failed_count = 0
+
+        if use_inotify is None:
+            use_inotify = _Inotify.available()
+        self.inotify = _Inotify(directory) if use_inotify else None
+        # Everything already in the directory is a candidate on start-up
+        self._mark(self._list_directory())
+
+    def _list_directory(self) -> List[str]:
+        with os.scandir(self.directory) as entries:
+            return [entry.name for entry in entries if entry.is_file()]
+
+    def _mark(self, names):
+        """Queue changed entries for the debounce check"""
+        now = time.monotonic()
+        for name in names:
+            if not name.lower().endswith(WATCHED_EXTENSIONS) or name.startswith('~$'):
+                continue
+            path = os.path.join(self.directory, name)
+            if path not in self.pending:
+                self.pending[path] = _Pending(-1, -1.0, now, now)
+
+    def _poll_changes(self, timeout: float):
+        if self.inotify is not None:
+            names = self.inotify.read(timeout)
+            if names is None:
+                logger.warning("⚠️ inotify event queue overflowed; rescanning the directory")
+                self._scan_directory()
+            else:
+                self._mark(names)
+            return
+        time.sleep(timeout)
+        self._scan_directory()
+
+    def _scan_directory(self):
+        """Mark entries whose size or mtime differ from their last analysis"""
+        busy = self._in_flight_paths()
+        changed = []
+        for name in self._list_directory():
+            path = os.path.join(self.directory, name)
+            if path in self.pending or path in busy:
+                continue
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            previous = self.analyzed.get(path)
+            if previous is None or (info.st_size, info.st_mtime) != (previous.size, previous.mtime):
+                changed.append(name)
+        self._mark(changed)
+
+    def _in_flight_paths(self) -> Set[str]:
+        return {path for path, _ in self.in_flight.values()}
+
+    def _check_pending(self):
+        """Submit pending files that have settled"""
+        now = time.monotonic()
+        busy = self._in_flight_paths()
+        for path, state in list(self.pending.items()):
+            if len(self.in_flight) >= self.workers * 2:
+                break
+            if path in busy:
+                continue
+            try:
+                info = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            if (info.st_size, info.st_mtime) != (state.size, state.mtime):
+                state.size, state.mtime, state.changed_at = info.st_size, info.st_mtime, now
+                continue
+            if now - state.changed_at < self.settle:
+                continue
+
+            fingerprint = read_fingerprint(path)
+            if fingerprint is None:
+                # Central directory not written yet; give up waiting eventually
+                # so a corrupt upload is still reported
+                if now - state.first_seen < self.max_wait:
+                    continue
+                fingerprint = FileFingerprint(info.st_size, info.st_mtime, ())
+            del self.pending[path]
+
+            previous = self.analyzed.get(path)
+            if fingerprint == previous or (fingerprint.crcs and fingerprint.same_content(previous)):
+                # Touched or copied without changing content
+                self.analyzed[path] = fingerprint
+                self.skipped_count += 1
+                continue
+            future = self.executor.submit(analyze_to_report, path, **self.analyze_options)
+            self.in_flight[future] = (path, fingerprint)
+
+    def _collect_results(self, wait: bool = False):
+        for future in list(self.in_flight):
+            if not wait and not future.done():
+                continue
+            path, fingerprint = self.in_flight.pop(future)
+            self.analyzed[path] = fingerprint
+            try:
+                report = future.result()
+            except Exception as e:
+                self.failed_count += 1
+                logger.error(f"❌ {os.path.basename(path)}: {e}")
+                continue
+            try:
+                self.sink.write(report, path)
+            except Exception as e:
+                # A full disk or locked database must not stop the watch
+                self.failed_count += 1
+                logger.error(f"❌ {os.path.basename(path)}: could not store report: {e}")
+                continue
+            self.analyzed_count += 1
+            logger.info(f"✅ {os.path.basename(path)}: {report.total_errors} issues")
+
+    def step(self, timeout: Optional[float] = None):
+        """Wait for changes once, then submit settled files and store results"""
+        self._poll_changes(self.interval if timeout is None else timeout)
+        self._check_pending()
+        self._collect_results()
+
+    def drain(self):
+        """Wait for all submitted analyses and store their results"""
+        self._collect_results(wait=True)
+
+    def run(self, max_cycles: Optional[int] = None):
+        """Watch until interrupted (or for ``max_cycles`` iterations)"""
+        cycles = 0
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                # Wake up more often while files are settling or being analyzed
+                busy = self.pending or self.in_flight
+                self.step(min(self.interval, max(self.settle / 4, 0.05)) if busy else self.interval)
+                cycles += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.drain()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.inotify is not None:
+            self.inotify.close()
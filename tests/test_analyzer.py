@@ -1,7 +1,12 @@
 import unittest
 import os
+import time
+from unittest import mock
+from zipfile import ZipFile
 from src.analyzer import ExcelAnalyzer
 from src.models import CellError, ErrorSeverity
+from src.constants import XMLNamespaces
+from src.utils import xml_utils
 from openpyxl.utils.exceptions import InvalidFileException
 from openpyxl import Workbook
 
@@ -112,6 +117,363 @@ class TestExcelAnalyzer(unittest.TestCase):
         self.assertIsNotNone(special_char_error.fix_suggestion)
         self.assertIn("Remove", special_char_error.fix_suggestion)
 
+    def _create_rows_file(self, name, rows=200):
+        test_file = os.path.join(self.test_files_dir, name)
+        wb = Workbook()
+        ws = wb.active
+        for i in range(1, rows + 1):
+            ws.cell(row=i, column=1, value=f'row\u200B{i}')
+        wb.create_sheet('Other')['A1'] = 'clean'
+        wb.save(test_file)
+        return test_file
+
+    def test_full_scan_coverage(self):
+        """Test that a normal run reports complete coverage"""
+        test_file = self._create_rows_file('full.xlsx')
+        errors = self.analyzer.analyze_file(test_file)
+        
+        coverage = self.analyzer.coverage
+        self.assertEqual(coverage.mode, "full")
+        self.assertTrue(coverage.complete)
+        self.assertEqual(coverage.sheets_scanned, 2)
+        self.assertEqual(coverage.rows_scanned, 201)
+        self.assertEqual(coverage.cell_errors, len(errors))
+        self.assertEqual(coverage.estimated_remaining_errors, 0)
+
+    def test_sampled_scan(self):
+        """Test sampled scan checks a subset of rows and estimates the rest"""
+        test_file = self._create_rows_file('sampled.xlsx')
+        errors = self.analyzer.analyze_file(test_file, sample=0.25)
+        
+        coverage = self.analyzer.coverage
+        self.assertEqual(coverage.mode, "sample")
+        self.assertFalse(coverage.complete)
+        self.assertEqual(coverage.rows_total, 201)
+        self.assertLess(coverage.rows_scanned, 201)
+        self.assertEqual(len(errors), coverage.cell_errors)
+        self.assertGreater(coverage.estimated_remaining_errors, 0)
+        
+        # Sampling is reproducible
+        self.analyzer.analyze_file(test_file, sample=0.25)
+        self.assertEqual(self.analyzer.coverage.rows_scanned, coverage.rows_scanned)
+
+    def test_sampled_scan_parses_less(self):
+        """Test unsampled rows never reach the XML parser"""
+        test_file = self._create_rows_file('sampled_bytes.xlsx', rows=2000)
+        backend = xml_utils.get_backend()
+        iter_rows = type(backend).iter_rows
+        parsed = []
+        
+        def counting_iter_rows(self, source, *args):
+            read = source.read
+            
+            def counting_read(size=-1):
+                data = read(size)
+                parsed.append(len(data))
+                return data
+            source.read = counting_read
+            return iter_rows(self, source, *args)
+        
+        with mock.patch.object(type(backend), 'iter_rows', counting_iter_rows):
+            self.analyzer.analyze_file(test_file, parser=backend.name)
+            full = sum(parsed)
+            parsed.clear()
+            self.analyzer.analyze_file(test_file, sample=0.1, parser=backend.name)
+            sampled = sum(parsed)
+        self.assertLess(sampled, full * 0.3)
+        self.assertEqual(self.analyzer.coverage.rows_total, 2001)
+        self.assertLess(self.analyzer.coverage.rows_scanned, 600)
+
+    def test_deadline_exhausted(self):
+        """Test that an exhausted deadline still analyzes structure"""
+        test_file = self._create_rows_file('deadline.xlsx')
+        errors = self.analyzer.analyze_file(test_file, deadline=1e-9)
+        
+        coverage = self.analyzer.coverage
+        self.assertTrue(coverage.deadline_reached)
+        self.assertFalse(coverage.complete)
+        self.assertEqual(coverage.sheets_scanned, 0)
+        self.assertEqual(sorted(coverage.skipped_sheets), ['Other', 'Sheet'])
+        self.assertEqual(coverage.rows_total, 201)
+        self.assertEqual(errors, [])
+
+    def test_collect_stats(self):
+        """Test workbook statistics collected during the scan"""
+        test_file = os.path.join(self.test_files_dir, 'stats.xlsx')
+        wb = Workbook()
+        ws = wb.active
+        ws['B2'] = 'abc'
+        ws['C2'] = 42
+        ws['D5'] = '=SUM(C2:C3)'
+        wb.save(test_file)
+        
+        self.analyzer.analyze_file(test_file, collect_stats=True)
+        stats = self.analyzer.stats
+        sheet = stats.sheets['Sheet']
+        
+        self.assertEqual(sheet.cells, 3)
+        self.assertEqual(sheet.rows, 2)
+        self.assertEqual(sheet.formulas, 1)
+        self.assertEqual(sheet.cells_by_type['inlineStr'], 1)
+        self.assertEqual(sheet.used_range, 'B2:D5')
+        self.assertEqual(sheet.string_lengths.count, 1)
+        self.assertIn('xl/worksheets/sheet1.xml', stats.parts)
+        self.assertGreater(stats.total_uncompressed_size, stats.total_compressed_size)
+        
+        # Stats are off by default
+        self.analyzer.analyze_file(test_file)
+        self.assertIsNone(self.analyzer.stats)
+
+    def _opened_parts(self, test_file, **options):
+        opened = []
+        original_open = ZipFile.open
+        
+        def tracking_open(zf, name, *args, **kwargs):
+            opened.append(getattr(name, 'filename', name))
+            return original_open(zf, name, *args, **kwargs)
+        
+        with mock.patch.object(ZipFile, 'open', tracking_open):
+            errors = self.analyzer.analyze_file(test_file, **options)
+        return errors, opened
+
+    def test_sheet_name_rules_skip_worksheets(self):
+        """Test a sheet-name-only run never reads worksheet parts"""
+        test_file = os.path.join(self.test_files_dir, 'rules.xlsx')
+        wb = Workbook()
+        wb.active.title = 'A' * 40
+        wb.active['A1'] = 'x' * 40000
+        wb.save(test_file)
+        
+        errors, opened = self._opened_parts(test_file, rules=['sheet-name-length'])
+        
+        self.assertEqual([e.error_type for e in errors], ["Sheet name too long"])
+        self.assertIn('xl/workbook.xml', opened)
+        self.assertFalse(any(name.startswith('xl/worksheets/') for name in opened))
+
+    def test_skip_rules(self):
+        """Test skipped rules are not reported"""
+        test_file = self._create_rows_file('skip.xlsx', rows=5)
+        errors = self.analyzer.analyze_file(test_file, skip_rules=['cell-zero-width'])
+        self.assertFalse(any(e.error_type == "Special character" for e in errors))
+        
+        errors = self.analyzer.analyze_file(test_file)
+        self.assertEqual(len([e for e in errors if e.error_type == "Special character"]), 5)
+
+    def test_unknown_rule(self):
+        """Test rejection of unknown rule names"""
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_file("unused.xlsx", rules=['no-such-rule'])
+
+    def _create_raw_file(self, name, rows, shared_strings=None, edits=None):
+        """Create a workbook whose first sheet holds the given <row> XML
+
+        ``edits`` maps part names to functions rewriting the part's XML.
+        """
+        base_file = self._create_rows_file('base.xlsx', rows=1)
+        test_file = os.path.join(self.test_files_dir, name)
+        with ZipFile(base_file) as src, ZipFile(test_file, 'w') as dst:
+            for item in src.infolist():
+                data = src.read(item.filename)
+                if item.filename == 'xl/worksheets/sheet1.xml':
+                    head, _, rest = data.decode().partition('<sheetData>')
+                    data = (head + '<sheetData>' + rows + '</sheetData>' +
+                            rest.partition('</sheetData>')[2]).encode()
+                if edits and item.filename in edits:
+                    data = edits[item.filename](data.decode()).encode()
+                dst.writestr(item, data)
+            # openpyxl writes inline strings, so any shared strings table is ours
+            if shared_strings is not None:
+                dst.writestr('xl/sharedStrings.xml', shared_strings)
+        return test_file
+
+    def test_shared_string_health(self):
+        """Test duplicate, unreferenced, count and invalid reference findings"""
+        shared_strings = (
+            f'<sst xmlns="{XMLNamespaces.MAIN}" count="9" uniqueCount="6">'
+            '<si><t>a</t></si><si><t>b</t></si><si><t>a</t></si><si><t>unused</t></si>'
+            '<si><r><t>a</t></r><r><t>b</t></r></si></sst>'
+        )
+        rows = ''.join(f'<row r="{i}"><c r="A{i}" t="s"><v>{index}</v></c></row>'
+                       for i, index in enumerate([0, 1, 2, 4, 7], start=1))
+        test_file = self._create_raw_file('sst.xlsx', rows, shared_strings)
+        
+        errors = self.analyzer.analyze_file(test_file)
+        found = sorted((e.error_type, e.severity) for e in errors)
+        self.assertEqual(found, [
+            ("Duplicate shared strings", ErrorSeverity.WARNING),
+            ("Invalid shared string reference", ErrorSeverity.CRITICAL),
+            ("Shared string count mismatch", ErrorSeverity.ERROR),
+            ("Shared string count mismatch", ErrorSeverity.ERROR),
+            ("Unreferenced shared strings", ErrorSeverity.WARNING),
+        ])
+        health = self.analyzer.sst_health
+        self.assertEqual((health.entries, health.references, health.invalid_references), (5, 5, 1))
+        self.assertEqual(health.duplicate_examples, [(2, 0)])
+        self.assertEqual(health.unreferenced_examples, [3])
+        self.assertEqual(health.reclaimable_bytes, (16 + 1) + (16 + 6))
+        
+        # A sampled scan cannot tell whether an entry is unused
+        self.analyzer.analyze_file(test_file, sample=0.1)
+        self.assertFalse(self.analyzer.coverage.complete)
+        self.assertIsNone(self.analyzer.sst_health.unreferenced)
+        
+        errors = self.analyzer.analyze_file(test_file, skip_rules=['sst-duplicates', 'sst-unreferenced',
+                                                                   'sst-counts'])
+        self.assertEqual(errors, [])
+        self.assertIsNone(self.analyzer.sst_health)
+
+    def test_rich_text_not_duplicate_of_plain(self):
+        """Test entries with equal text but different run formatting are not duplicates"""
+        shared_strings = (
+            f'<sst xmlns="{XMLNamespaces.MAIN}" count="3" uniqueCount="3">'
+            '<si><t>abc</t></si><si><r><rPr><b/></rPr><t>abc</t></r></si>'
+            '<si><r><rPr><b/></rPr><t>abc</t></r></si></sst>'
+        )
+        rows = ''.join(f'<row r="{i}"><c r="A{i}" t="s"><v>{i - 1}</v></c></row>' for i in range(1, 4))
+        test_file = self._create_raw_file('rich.xlsx', rows, shared_strings)
+        for parser in xml_utils.available_backends():
+            with self.subTest(parser=parser):
+                self.analyzer.analyze_file(test_file, parser=parser)
+                health = self.analyzer.sst_health
+                # Only the second bold entry repeats the first one
+                self.assertEqual((health.duplicates, health.duplicate_examples), (1, [(2, 1)]))
+
+    def test_parse_error_leaves_references_incomplete(self):
+        """Test a worksheet that fails to parse does not count as scanned"""
+        shared_strings = (f'<sst xmlns="{XMLNamespaces.MAIN}" count="3" uniqueCount="3">'
+                          '<si><t>a</t></si><si><t>b</t></si><si><t>c</t></si></sst>')
+        rows = ('<row r="1"><c r="A1" t="s"><v>0</v></c></row>'
+                '<row r="2"><c r="A2" t="s"><v>1</v></row>')
+        test_file = self._create_raw_file('broken.xlsx', rows, shared_strings)
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs), mock.patch('src.analyzer.ROW_RANGE_MIN_SIZE', 0):
+                errors = self.analyzer.analyze_file(test_file, jobs=jobs)
+                self.assertEqual(sorted(e.error_type for e in errors), ["XML parsing error"])
+                coverage = self.analyzer.coverage
+                self.assertFalse(coverage.complete)
+                self.assertEqual((coverage.sheets_scanned, coverage.failed_sheets), (1, ['Sheet']))
+                self.assertFalse(self.analyzer.sst_health.references_complete)
+
+    def test_row_range_scan_matches_sequential(self):
+        """Test a worksheet parsed as parallel row ranges gives the same results"""
+        rows = ''.join(f'<row r="{i}"><c r="A{i}" t="inlineStr"><is><t>row\u200B{i}</t></is></c>'
+                       f'<c r="B{i}"><f>A{i}</f><v>{i}</v></c>'
+                       f'<c r="C{i}" t="s"><v>{i % 3}</v></c>'
+                       f'<c r="D{i}"><v>{"NaN" if i % 7 == 0 else i}</v></c></row>' for i in range(1, 301))
+        shared_strings = (f'<sst xmlns="{XMLNamespaces.MAIN}" count="300" uniqueCount="4">' +
+                          ''.join(f'<si><t>s{i}</t></si>' for i in range(4)) + '</sst>')
+        test_file = self._create_raw_file('inline.xlsx', rows, shared_strings)
+        
+        expected = self.analyzer.analyze_file(test_file, collect_stats=True)
+        expected_stats = self.analyzer.stats.to_dict()
+        with mock.patch('src.analyzer.ROW_RANGE_MIN_SIZE', 0):
+            errors = self.analyzer.analyze_file(test_file, collect_stats=True, jobs=2)
+        self.assertEqual(len([e for e in errors if e.sheet_name == 'Sheet']), 300 + 300 // 7)
+        self.assertEqual(self.analyzer.sst_health.unreferenced_examples, [3])
+        self.assertEqual(errors, expected)
+        # Numeric findings sit in row order however the cells were batched
+        self.assertEqual([e.row for e in errors if e.error_type == "Invalid number"],
+                         list(range(7, 301, 7)))
+        self.assertEqual([(e.error_type, e.row) for e in errors[6:8]],
+                         [("Special character", 7), ("Invalid number", 7)])
+        self.assertEqual(self.analyzer.stats.to_dict(), expected_stats)
+        self.assertEqual(self.analyzer.coverage.rows_scanned, 301)
+        self.assertTrue(self.analyzer.coverage.complete)
+        with mock.patch('src.analyzer.NUMERIC_BATCH_SIZE', 5):
+            self.assertEqual(self.analyzer.analyze_file(test_file), expected)
+
+    def test_row_range_fallback_reads_sheet_once(self):
+        """Test a worksheet that cannot be split is parsed from the shared copy"""
+        edits = {'xl/worksheets/sheet1.xml': lambda xml: xml.replace('<sheetData></sheetData>', '<sheetData/>')}
+        test_file = self._create_raw_file('unsplittable.xlsx', '', edits=edits)
+        with mock.patch('src.analyzer.ROW_RANGE_MIN_SIZE', 0):
+            errors, opened = self._opened_parts(test_file, jobs=2)
+        self.assertEqual(errors, [])
+        self.assertEqual(opened.count('xl/worksheets/sheet1.xml'), 1)
+        self.assertEqual(opened.count('xl/worksheets/sheet2.xml'), 1)
+        self.assertTrue(self.analyzer.coverage.complete)
+
+    @unittest.skipUnless((os.cpu_count() or 1) >= 4, "needs at least 4 CPU cores")
+    def test_row_range_scan_speedup(self):
+        """Test row ranges on 4 processes finish well ahead of a sequential scan"""
+        rows = ''.join(f'<row r="{i}"><c r="A{i}" t="inlineStr"><is><t>text {i}</t></is></c>'
+                       f'<c r="B{i}"><v>{i}.5</v></c><c r="C{i}"><v>{i * 7}</v></c></row>'
+                       for i in range(1, 150001))
+        test_file = self._create_raw_file('speedup.xlsx', rows)
+        
+        def timed(**options):
+            started = time.perf_counter()
+            errors = self.analyzer.analyze_file(test_file, **options)
+            return time.perf_counter() - started, errors
+        
+        sequential, expected = timed()
+        with mock.patch('src.analyzer.ROW_RANGE_MIN_SIZE', 0):
+            parallel, errors = timed(jobs=4)
+        self.assertEqual(errors, expected)
+        self.assertLess(parallel, sequential / 2)
+
+    def test_numeric_value_checks(self):
+        """Test invalid, out of range, imprecise and out of range date values"""
+        values = [('NaN', ''), ('1e309', ''), ('1234567890123456789', ''), ('-5', ' s="1"'),
+                  ('45000', ' s="1"'), ('1.5', ''), ('1E+20', ''), ('abc', ' t="n"'),
+                  ('2958000', ' s="1"'), ('0.30000000000000004', '')]
+        rows = ''.join(f'<row r="{i}"><c r="A{i}"{attrs}><v>{value}</v></c></row>'
+                       for i, (value, attrs) in enumerate(values, start=1))
+        date_style = '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+        edits = {'xl/styles.xml': lambda xml: xml.replace('</cellXfs>', date_style)}
+        test_file = self._create_raw_file('numbers.xlsx', rows, edits=edits)
+        expected = [
+            ("Invalid number", 'A1'),
+            ("Number out of range", 'A2'),
+            ("Precision loss", 'A3'),
+            ("Date out of range", 'A4'),
+            ("Invalid number", 'A8'),
+        ]
+        
+        def found(errors):
+            return [(e.error_type, f"{e.column}{e.row}") for e in errors]
+        
+        self.assertEqual(found(self.analyzer.analyze_file(test_file)), expected)
+        with mock.patch('src.utils.numeric_utils.np', None):
+            self.assertEqual(found(self.analyzer.analyze_file(test_file)), expected)
+        with mock.patch('src.analyzer.NUMERIC_BATCH_SIZE', 3):
+            self.assertEqual(found(self.analyzer.analyze_file(test_file)), expected)
+        
+        # 2958000 is in 9999 under the 1900 date system but past it under 1904
+        edits['xl/workbook.xml'] = lambda xml: xml.replace('<workbookPr/>', '<workbookPr date1904="1"/>')
+        test_file = self._create_raw_file('numbers1904.xlsx', rows, edits=edits)
+        errors = self.analyzer.analyze_file(test_file, rules=['date-out-of-range'])
+        self.assertEqual(found(errors), [("Date out of range", 'A4'), ("Date out of range", 'A9')])
+        
+        # Cells without an s attribute use xf 0, which may show dates too
+        edits = {'xl/styles.xml': lambda xml: xml.replace('<cellXfs count="1"><xf numFmtId="0"',
+                                                          '<cellXfs count="1"><xf numFmtId="14"')}
+        test_file = self._create_raw_file('default_date.xlsx', '<row r="1"><c r="A1"><v>-1</v></c></row>',
+                                          edits=edits)
+        errors = self.analyzer.analyze_file(test_file, rules=['date-out-of-range'])
+        self.assertEqual(found(errors), [("Date out of range", 'A1')])
+
+    def test_cells_without_reference(self):
+        """Test findings on cells without an r attribute are located, not fatal"""
+        rows = ('<row r="1"><c><v>NaN</v></c><c r="C1"/><c><v>INF</v></c></row>'
+                '<row><c t="inlineStr"><is><t>zero\u200Bwidth</t></is></c></row>')
+        test_file = self._create_raw_file('no_refs.xlsx', rows)
+        errors = self.analyzer.analyze_file(test_file)
+        self.assertEqual([(e.error_type, e.column, e.row) for e in errors], [
+            ("Invalid number", 'A', 1),
+            ("Invalid number", 'D', 1),
+            ("Special character", 'A', 0),
+        ])
+
+    def test_invalid_budget_options(self):
+        """Test rejection of invalid deadline and sample values"""
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_file("unused.xlsx", deadline=0)
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_file("unused.xlsx", sample=1.5)
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_file("unused.xlsx", jobs=0)
+
     def tearDown(self):
         # Clean up test files
         if os.path.exists(self.test_files_dir):
@@ -0,0 +1,109 @@
+import unittest
+import os
+import json
+import shutil
+import time
+from openpyxl import Workbook
+from src.batch import WorkQueue, BatchWorker, collect_paths, DONE, FAILED, LEASED
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.test_files_dir = os.path.join(os.path.dirname(__file__), 'test_files')
+        self.input_dir = os.path.join(self.test_files_dir, 'input')
+        self.results_dir = os.path.join(self.test_files_dir, 'results')
+        self.queue_path = os.path.join(self.test_files_dir, 'queue.db')
+        os.makedirs(self.input_dir, exist_ok=True)
+        
+        for i in range(3):
+            wb = Workbook()
+            wb.active['A1'] = f'value\u200B{i}'
+            wb.save(os.path.join(self.input_dir, f'book{i}.xlsx'))
+        with open(os.path.join(self.input_dir, 'broken.xlsx'), 'w') as f:
+            f.write('Not a valid Excel file')
+        with open(os.path.join(self.input_dir, 'notes.txt'), 'w') as f:
+            f.write('ignored')
+
+    def test_enqueue_is_idempotent(self):
+        """Test enqueueing the same files twice adds them once"""
+        with WorkQueue(self.queue_path) as queue:
+            self.assertEqual(queue.enqueue(collect_paths([self.input_dir])), 4)
+            self.assertEqual(queue.enqueue(collect_paths([self.input_dir])), 0)
+            self.assertEqual(queue.progress().total, 4)
+
+    def test_workers_process_batch(self):
+        """Test workers finish the batch, retrying failures up to the limit"""
+        with WorkQueue(self.queue_path) as queue:
+            queue.enqueue(collect_paths([self.input_dir]))
+        
+        first = BatchWorker(self.queue_path, self.results_dir, batch_size=1,
+                            max_attempts=2, idle_wait=0.01)
+        first.run(max_tasks=2)
+        second = BatchWorker(self.queue_path, self.results_dir, batch_size=2,
+                             max_attempts=2, idle_wait=0.01)
+        second.run()
+        
+        with WorkQueue(self.queue_path) as queue:
+            progress = queue.progress()
+            failures = queue.failures()
+        self.assertEqual(progress.counts, {DONE: 3, FAILED: 1})
+        self.assertEqual(progress.finished, 4)
+        self.assertEqual(progress.eta_seconds, 0.0)
+        self.assertEqual(progress.active_workers, 0)
+        self.assertEqual(len(failures), 1)
+        self.assertTrue(failures[0][0].endswith('broken.xlsx'))
+        self.assertEqual(failures[0][1], 2)
+        
+        results = sorted(os.listdir(self.results_dir))
+        self.assertEqual(len(results), 3)
+        with open(os.path.join(self.results_dir, results[0]), encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data["total_errors"], 1)
+        self.assertTrue(data["source_path"].endswith('.xlsx'))
+
+    def test_expired_lease_is_reclaimed(self):
+        """Test a crashed worker's lease expires and its result is not recorded"""
+        with WorkQueue(self.queue_path, lease=0.05) as queue:
+            queue.enqueue([os.path.join(self.input_dir, 'book0.xlsx')])
+            crashed = queue.claim('crashed-worker')
+            self.assertEqual(len(crashed), 1)
+            self.assertEqual(queue.claim('other-worker'), [])
+            
+            time.sleep(0.1)
+            retried = queue.claim('other-worker')
+            self.assertEqual([task.id for task in retried], [crashed[0].id])
+            self.assertEqual(retried[0].attempts, 2)
+            
+            # The late original worker cannot complete a task it no longer holds
+            self.assertFalse(queue.complete(crashed[0], 'crashed-worker', 0, 'late.json'))
+            self.assertTrue(queue.complete(retried[0], 'other-worker', 0, 'result.json'))
+            self.assertEqual(queue.progress().counts, {DONE: 1})
+
+    def test_lost_lease_not_counted_as_processed(self):
+        """Test a worker only counts tasks whose completion it recorded"""
+        worker = BatchWorker(self.queue_path, self.results_dir, worker_id='slow-worker')
+        with WorkQueue(self.queue_path, lease=0.05) as queue:
+            queue.enqueue([os.path.join(self.input_dir, 'book0.xlsx')])
+            task = queue.claim('slow-worker')[0]
+            time.sleep(0.1)
+            queue.claim('other-worker')
+            
+            worker._process(queue, task)
+            self.assertEqual((worker.processed, worker.failed, worker.lost), (0, 0, 1))
+            self.assertEqual(worker.attempted, 1)
+            self.assertEqual(queue.progress().counts, {LEASED: 1})
+
+    def test_heartbeat_extends_lease(self):
+        """Test heartbeats keep a lease from expiring"""
+        with WorkQueue(self.queue_path, lease=0.2) as queue:
+            queue.enqueue([os.path.join(self.input_dir, 'book0.xlsx')])
+            queue.register_worker('busy-worker')
+            queue.claim('busy-worker')
+            for _ in range(3):
+                time.sleep(0.1)
+                queue.heartbeat('busy-worker')
+            self.assertEqual(queue.claim('other-worker'), [])
+            self.assertEqual(queue.progress().counts, {LEASED: 1})
+            self.assertEqual(queue.progress().active_workers, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_files_dir, ignore_errors=True)
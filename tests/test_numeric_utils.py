@@ -0,0 +1,61 @@
+import unittest
+from unittest import mock
+from src.utils import numeric_utils
+from src.utils.numeric_utils import NumericBatch, NumericColumn, is_date_format
+
+class TestNumericUtils(unittest.TestCase):
+    def test_is_date_format(self):
+        """Test date tokens are found outside quoted text, colours and escapes"""
+        for code in ['yyyy-mm-dd', 'd/m/yy h:mm', '[$-409]mmmm d, yyyy', 'h:mm AM/PM', '[h]:mm:ss']:
+            self.assertTrue(is_date_format(code), code)
+        for code in ['General', '0.00', '#,##0_);[Red](#,##0)', '0 "days"', '\\d0', '0.00;[Red]-0.00']:
+            self.assertFalse(is_date_format(code), code)
+
+    def test_checks_match_without_numpy(self):
+        """Test the vectorized and pure Python checks find the same cells"""
+        batch = NumericBatch()
+        for i, (text, style) in enumerate([('1', ''), ('nan', ''), ('-inf', '2'), ('1e-320', ''),
+                                           ('-2e308', ''), ('12345678901234567', ''),
+                                           ('123456789012345', ''), ('3000000', '2'),
+                                           ('-0.5', '2'), ('x', ''), ('0', '')], start=1):
+            batch.add(text, f'A{i}', style)
+        
+        def results():
+            column = NumericColumn(batch, frozenset({2}))
+            return (column.invalid(), column.out_of_range(), column.imprecise(),
+                    column.dates_out_of_range())
+        
+        expected = ([1, 2, 9], [3, 4], [5], [7, 8])
+        self.assertEqual(results(), expected)
+        with mock.patch.object(numeric_utils, 'np', None):
+            self.assertEqual(results(), expected)
+
+    def test_only_xsd_double_spellings_parse(self):
+        """Test spellings float() accepts but xsd:double does not are invalid"""
+        texts = ['1_000', ' 5 ', '5\n', '\u0661\u0662', '0x10', 'Infinity', 'nan', '-INF', '',
+                 '5.', '.5', '+1E+3', '-0']
+        batch = NumericBatch()
+        for i, text in enumerate(texts, start=1):
+            batch.add(text, f'A{i}', '')
+        self.assertEqual(NumericColumn(batch).invalid(), list(range(9)))
+        with mock.patch.object(numeric_utils, 'np', None):
+            self.assertEqual(NumericColumn(batch).invalid(), list(range(9)))
+        
+        valid = NumericBatch()
+        for text in texts[9:]:
+            valid.add(text, 'A1', '')
+        self.assertEqual(NumericColumn(valid).invalid(), [])
+
+    def test_precision_counts_written_digits(self):
+        """Test digits already lost when parsing the text still count"""
+        texts = ['10000000000000001', '100000000000000000001', '-0012345678901234567e2',
+                 '1000000000000000000000', '123456789012345E5', '1.5e15', '9007199254740993.0']
+        batch = NumericBatch()
+        for i, text in enumerate(texts, start=1):
+            batch.add(text, f'A{i}', '')
+        self.assertEqual(NumericColumn(batch).imprecise(), [0, 1, 2, 6])
+        with mock.patch.object(numeric_utils, 'np', None):
+            self.assertEqual(NumericColumn(batch).imprecise(), [0, 1, 2, 6])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
 import os
 import json
-from src.models import CellError, ErrorSeverity
-from src.utils.report_utils import generate_report, export_report_json, export_report_html
+import shutil
+from src.models import CellError, ErrorSeverity, ScanCoverage, WorkbookStats, SheetStats, LengthHistogram
+from src.utils.report_utils import generate_report, export_report_json, export_report_html, export_report_html_paged
+from src.utils.db_utils import FindingsDatabase, export_report_sqlite
 
 class TestReports(unittest.TestCase):
     def setUp(self):
@@ -92,9 +94,129 @@ class TestReports(unittest.TestCase):
             self.assertIn("Sheet1", content)
             self.assertIn("Sheet2", content)
 
+    def test_export_html_paged(self):
+        """Test paged HTML export writes a summary page and indexed chunks"""
+        errors = [CellError(sheet_name=f"Sheet{i % 3}", row=i + 1, column="A",
+                            error_type="Special character", details=f"<b>finding {i}</b>",
+                            severity=ErrorSeverity.WARNING if i % 2 else ErrorSeverity.ERROR)
+                  for i in range(250)]
+        report = generate_report("test.xlsx", errors)
+        html_file = os.path.join(self.test_files_dir, "paged.html")
+        
+        data_dir = export_report_html_paged(report, html_file, page_size=100)
+        
+        self.assertEqual(data_dir, os.path.join(os.path.abspath(self.test_files_dir), "paged_files"))
+        self.assertEqual(sorted(os.listdir(data_dir)),
+                         ["findings-00001.js", "findings-00002.js", "findings-00003.js", "index.js"])
+        with open(os.path.join(data_dir, "index.js"), encoding='utf-8') as f:
+            index = json.loads(f.read()[len("excelReport.loadIndex("):-len(");\n")])
+        self.assertEqual([chunk["count"] for chunk in index["chunks"]], [100, 100, 50])
+        self.assertEqual(index["sheets"], ["Sheet0", "Sheet1", "Sheet2"])
+        # Errors come before warnings, so the first chunk holds errors only
+        error_id = index["severities"].index("error")
+        self.assertEqual(index["chunks"][0]["severities"], {str(error_id): 100})
+        
+        with open(html_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        self.assertIn("Total errors found: 250", content)
+        self.assertIn('<script src="paged_files/index.js">', content)
+        self.assertNotIn("finding 0", content)
+
+    def test_partial_coverage_export(self):
+        """Test coverage of a partial scan is exported"""
+        coverage = ScanCoverage(mode="deadline", sheets_total=2, sheets_scanned=1,
+                                rows_total=100, rows_scanned=40, cell_errors=2,
+                                deadline_reached=True, skipped_sheets=["<b>Q&A</b>"],
+                                failed_sheets=["Broken"])
+        report = generate_report("test.xlsx", self.errors, coverage)
+        json_file = os.path.join(self.test_files_dir, "coverage.json")
+        html_file = os.path.join(self.test_files_dir, "coverage.html")
+        
+        export_report_json(report, json_file)
+        export_report_html(report, html_file)
+        
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)["coverage"]
+        self.assertFalse(data["complete"])
+        self.assertEqual(data["row_coverage"], 0.4)
+        self.assertEqual(data["estimated_remaining_errors"], 3.0)
+        with open(html_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        self.assertIn("Partial Scan (deadline)", content)
+        self.assertIn("Rows scanned: 40 of ~100", content)
+        # Skipped sheet names are markup-escaped too
+        self.assertIn("(skipped: &lt;b&gt;Q&amp;A&lt;/b&gt;)", content)
+        self.assertIn("Sheets that failed to parse: Broken", content)
+
+    def test_length_histogram(self):
+        """Test fixed-bucket string length histogram"""
+        histogram = LengthHistogram()
+        for length in (0, 1, 3, 3, 40000, 100000):
+            histogram.add(length)
+        
+        data = histogram.to_dict()
+        self.assertEqual(data["count"], 6)
+        self.assertEqual(data["max_length"], 100000)
+        self.assertEqual(data["buckets"], {"0": 1, "1": 1, "2-3": 2, "32768-65535": 1, "65536+": 1})
+
+    def test_stats_export(self):
+        """Test workbook statistics are exported"""
+        stats = WorkbookStats(shared_strings=4, shared_string_references=8)
+        stats.sheets["Sheet1"] = SheetStats(name="Sheet1", rows=2, cells=5,
+                                            min_row=1, max_row=2, min_column=1, max_column=3)
+        report = generate_report("test.xlsx", self.errors, stats=stats)
+        json_file = os.path.join(self.test_files_dir, "stats.json")
+        html_file = os.path.join(self.test_files_dir, "stats.html")
+        
+        export_report_json(report, json_file)
+        export_report_html(report, html_file)
+        
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)["stats"]
+        self.assertEqual(data["shared_strings"]["unique_to_referenced_ratio"], 0.5)
+        self.assertEqual(data["sheets"]["Sheet1"]["used_range"], "A1:C2")
+        with open(html_file, 'r', encoding='utf-8') as f:
+            self.assertIn("Workbook Statistics", f.read())
+        
+        # Sheet names are markup-escaped in the statistics table
+        stats.sheets["<b>Q&A</b>"] = SheetStats(name="<b>Q&A</b>")
+        export_report_html(generate_report("test.xlsx", self.errors, stats=stats), html_file)
+        with open(html_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        self.assertIn("<td>&lt;b&gt;Q&amp;A&lt;/b&gt;</td>", content)
+        self.assertNotIn("<b>Q&A</b>", content)
+
+    def test_export_sqlite(self):
+        """Test findings database export and queries"""
+        db_file = os.path.join(self.test_files_dir, "findings.db")
+        report = generate_report("test.xlsx", self.errors)
+        critical = generate_report("other.xlsx", [CellError(
+            sheet_name="Shared strings", row=0, column="", error_type="XML parsing error",
+            details="Broken", severity=ErrorSeverity.CRITICAL)])
+        
+        export_report_sqlite(report, db_file, "test.xlsx")
+        with FindingsDatabase(db_file) as db:
+            db.record_reports([(critical, "other.xlsx"), (report, "test.xlsx")])
+            
+            # test.xlsx was analyzed twice; only its latest run counts unless asked
+            self.assertEqual(dict(db.count_by('severity')),
+                             {"error": 1, "warning": 1, "info": 1, "critical": 1})
+            self.assertEqual(dict(db.count_by('severity', all_runs=True)),
+                             {"error": 2, "warning": 2, "info": 2, "critical": 1})
+            files = db.files_with_findings(severity="critical", sheet_name="Shared strings")
+            self.assertEqual([os.path.basename(path) for path, _, _ in files], ["other.xlsx"])
+            self.assertEqual(len(db.files_with_findings()), 2)
+            self.assertEqual(len(db.recent_runs()), 3)
+            self.assertEqual(db.files_with_findings(since=4102444800), [])
+            
+            # Only the latest run of each file counts: test.xlsx was analyzed
+            # twice with 3 findings, other.xlsx now has 4
+            db.record_report(generate_report("other.xlsx", self.errors + self.errors[:1]), "other.xlsx")
+            counts = [(os.path.basename(path), count) for path, count, _ in db.files_with_findings()]
+            self.assertEqual(counts, [("other.xlsx", 4), ("test.xlsx", 3)])
+            self.assertEqual(db.conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+
     def tearDown(self):
         # Clean up test files
         if os.path.exists(self.test_files_dir):
-            for file in os.listdir(self.test_files_dir):
-                os.remove(os.path.join(self.test_files_dir, file))
-            os.rmdir(self.test_files_dir) 
\ No newline at end of file
+            shutil.rmtree(self.test_files_dir)
\ No newline at end of file
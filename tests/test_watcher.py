@@ -0,0 +1,134 @@
+import unittest
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from openpyxl import Workbook
+from src.utils.report_utils import ReportSink
+from src.cli import watch_main
+from src.watcher import DirectoryWatcher, read_fingerprint, _Inotify
+
+class TestDirectoryWatcher(unittest.TestCase):
+    def setUp(self):
+        self.test_files_dir = os.path.join(os.path.dirname(__file__), 'test_files')
+        self.drop_dir = os.path.join(self.test_files_dir, 'drop')
+        self.report_dir = os.path.join(self.test_files_dir, 'reports')
+        os.makedirs(self.drop_dir, exist_ok=True)
+
+    def _workbook_bytes(self, value):
+        path = os.path.join(self.test_files_dir, 'source.xlsx')
+        wb = Workbook()
+        wb.active['A1'] = value
+        wb.save(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.remove(path)
+        return data
+
+    def _create_watcher(self, use_inotify):
+        watcher = DirectoryWatcher(self.drop_dir, ReportSink(json_dir=self.report_dir),
+                                   workers=2, settle=0.0, interval=0.01, max_wait=60,
+                                   use_inotify=use_inotify, executor=ThreadPoolExecutor(2))
+        self.addCleanup(watcher.close)
+        return watcher
+
+    def _step_until(self, watcher, condition, steps=100):
+        for _ in range(steps):
+            watcher.step()
+            watcher.drain()
+            if condition():
+                return True
+        return False
+
+    def _check_watch_cycle(self, use_inotify):
+        watcher = self._create_watcher(use_inotify)
+        target = os.path.join(self.drop_dir, 'upload.xlsx')
+        data = self._workbook_bytes('zero\u200Bwidth')
+        
+        # A partially written file is not analyzed
+        with open(target, 'wb') as f:
+            f.write(data[:len(data) // 2])
+        for _ in range(5):
+            watcher.step()
+        watcher.drain()
+        self.assertEqual(watcher.analyzed_count, 0)
+        
+        # Once the central directory is complete it is analyzed once
+        with open(target, 'wb') as f:
+            f.write(data)
+        self.assertTrue(self._step_until(watcher, lambda: watcher.analyzed_count == 1))
+        self.assertTrue(os.path.exists(os.path.join(self.report_dir, 'upload.xlsx.json')))
+        
+        # Rewriting the same content (new mtime, same part CRCs) is skipped
+        time.sleep(0.01)
+        with open(target, 'wb') as f:
+            f.write(data)
+        self.assertTrue(self._step_until(watcher, lambda: watcher.skipped_count == 1))
+        self.assertEqual(watcher.analyzed_count, 1)
+        
+        # New content is analyzed again
+        with open(target, 'wb') as f:
+            f.write(self._workbook_bytes('changed'))
+        self.assertTrue(self._step_until(watcher, lambda: watcher.analyzed_count == 2))
+        
+        # Other files are ignored
+        with open(os.path.join(self.drop_dir, 'notes.txt'), 'w') as f:
+            f.write('not a workbook')
+        for _ in range(3):
+            watcher.step()
+        self.assertEqual(watcher.pending, {})
+
+    def test_polling(self):
+        """Test polling watch cycle: debounce, analysis, skip unchanged"""
+        self._check_watch_cycle(use_inotify=False)
+
+    @unittest.skipUnless(_Inotify.available(), "inotify not available")
+    def test_inotify(self):
+        """Test inotify watch cycle: debounce, analysis, skip unchanged"""
+        self._check_watch_cycle(use_inotify=True)
+
+    def test_inotify_overflow_rescans(self):
+        """Test lost inotify events are recovered by rescanning the directory"""
+        watcher = self._create_watcher(use_inotify=False)
+        watcher.inotify = mock.Mock(read=mock.Mock(return_value=None))
+        with open(os.path.join(self.drop_dir, 'lost.xlsx'), 'wb') as f:
+            f.write(self._workbook_bytes('value'))
+        self.assertTrue(self._step_until(watcher, lambda: watcher.analyzed_count == 1))
+
+    def test_sink_failure_does_not_stop_watch(self):
+        """Test a report that cannot be stored is counted as a failure"""
+        watcher = self._create_watcher(use_inotify=False)
+        watcher.sink = mock.Mock(write=mock.Mock(side_effect=OSError("disk full")))
+        with open(os.path.join(self.drop_dir, 'upload.xlsx'), 'wb') as f:
+            f.write(self._workbook_bytes('value'))
+        self.assertTrue(self._step_until(watcher, lambda: watcher.failed_count == 1))
+        self.assertEqual(watcher.analyzed_count, 0)
+        watcher.step()
+
+    def test_invalid_options_rejected_at_start(self):
+        """Test invalid analysis options stop watch before any file is analyzed"""
+        for options in (['--sample', '5'], ['--jobs', '0'], ['--rules', 'typo']):
+            with self.subTest(options=options):
+                with mock.patch('src.cli.DirectoryWatcher') as watcher, \
+                        mock.patch('sys.stderr', io.StringIO()):
+                    with self.assertRaises(SystemExit) as raised:
+                        watch_main([self.drop_dir, '--json-dir', self.report_dir] + options)
+                self.assertEqual(raised.exception.code, 2)
+                watcher.assert_not_called()
+
+    def test_read_fingerprint(self):
+        """Test fingerprints of complete and truncated workbooks"""
+        path = os.path.join(self.drop_dir, 'fp.xlsx')
+        data = self._workbook_bytes('value')
+        with open(path, 'wb') as f:
+            f.write(data[:-10])
+        self.assertIsNone(read_fingerprint(path))
+        with open(path, 'wb') as f:
+            f.write(data)
+        fingerprint = read_fingerprint(path)
+        self.assertIn('xl/worksheets/sheet1.xml', dict(fingerprint.crcs))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_files_dir, ignore_errors=True)
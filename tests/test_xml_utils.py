@@ -0,0 +1,174 @@
+import unittest
+import io
+import os
+import tracemalloc
+import xml.etree.ElementTree as ET
+from openpyxl import Workbook
+from src.analyzer import ExcelAnalyzer
+from src.constants import XMLNamespaces
+from src.utils import xml_utils
+
+SHEET_XML = f"""<worksheet xmlns="{XMLNamespaces.MAIN}">
+<dimension ref="A1:D3"/>
+<sheetData>
+<row r="1"><c r="A1" t="inlineStr"><is><r><t>rich</t></r><r><t> text</t></r></is></c><c r="B1"><v>1.5</v></c></row>
+<row r="2"><c r="A2" t="s"><v>0</v></c><c r="B2"><f>B1*2</f><v>3</v></c><c r="C2" t="str"><v>a&amp;b</v></c></row>
+<row r="3"><c r="D3" t="inlineStr"><is><t></t></is></c><c r="E3"/></row>
+</sheetData>
+</worksheet>""".encode()
+
+SST_XML = f"""<sst xmlns="{XMLNamespaces.MAIN}" count="4" uniqueCount="3">
+<si><t>plain</t></si>
+<si><r><rPr><b/><sz val="11"/></rPr><t>first</t></r><r><t>second</t></r><rPh sb="0" eb="1"><t>ph</t></rPh></si>
+<si><t/></si>
+</sst>""".encode()
+
+class TestParserBackends(unittest.TestCase):
+    def setUp(self):
+        self.backends = xml_utils.available_backends()
+        self.test_files_dir = os.path.join(os.path.dirname(__file__), 'test_files')
+        os.makedirs(self.test_files_dir, exist_ok=True)
+
+    def test_default_backends_available(self):
+        """Test the stdlib and expat backends are always available"""
+        self.assertIn('stdlib', self.backends)
+        self.assertIn('expat', self.backends)
+        self.assertIn(xml_utils.get_backend().name, self.backends)
+        with self.assertRaises(ValueError):
+            xml_utils.get_backend('no-such-parser')
+
+    def test_backend_interface_is_abstract(self):
+        """Test a backend missing a streaming method cannot be created"""
+        class RowsOnly(xml_utils.ParserBackend):
+            def iter_rows(self, source, namespace=XMLNamespaces.MAIN):
+                return iter(())
+        with self.assertRaises(TypeError):
+            RowsOnly()
+
+    def test_rows_identical_across_backends(self):
+        """Test all backends produce identical row records"""
+        expected = list(xml_utils.get_backend('stdlib').iter_rows(io.BytesIO(SHEET_XML)))
+        self.assertEqual(expected[0].cells[0].inline_text, 'rich')
+        self.assertTrue(expected[1].cells[1].has_formula)
+        self.assertEqual(expected[1].cells[2].value, 'a&b')
+        self.assertIsNone(expected[2].cells[0].inline_text)
+        for name in self.backends:
+            with self.subTest(backend=name):
+                rows = list(xml_utils.get_backend(name).iter_rows(io.BytesIO(SHEET_XML)))
+                self.assertEqual(rows, expected)
+
+    def test_shared_strings_identical_across_backends(self):
+        """Test all backends produce identical shared strings"""
+        for name in self.backends:
+            with self.subTest(backend=name):
+                attributes = {}
+                strings = list(xml_utils.get_backend(name).iter_shared_strings(
+                    io.BytesIO(SST_XML), attributes))
+                self.assertEqual(strings, ['plain', 'first', None])
+                self.assertEqual(attributes.get('uniqueCount'), '3')
+                records = list(xml_utils.get_backend(name).iter_shared_string_records(io.BytesIO(SST_XML)))
+                self.assertEqual([r.full_text for r in records], ['plain', 'firstsecond', None])
+                self.assertEqual([r.formatting for r in records], [None, '5:b[]sz[val=11]|6:', None])
+
+    def test_row_memory_bounded(self):
+        """Test parsed rows are released, so memory does not grow with the row count"""
+        def peak_memory(rows):
+            data = SHEET_XML.replace(SHEET_XML[SHEET_XML.index(b'<row'):SHEET_XML.index(b'</sheetData>')],
+                                     b''.join(b'<row r="%d"><c r="A%d"><v>%d</v></c></row>' % (i, i, i)
+                                              for i in range(1, rows + 1)))
+            stream = io.BytesIO(data)
+            tracemalloc.start()
+            for _ in backend.iter_rows(stream):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+        
+        for name in self.backends:
+            with self.subTest(backend=name):
+                backend = xml_utils.get_backend(name)
+                self.assertLess(peak_memory(20000), 2 * peak_memory(2000))
+
+    def test_parse_errors_unified(self):
+        """Test malformed XML raises ET.ParseError for every backend"""
+        broken = SHEET_XML[:200]
+        for name in self.backends:
+            with self.subTest(backend=name):
+                with self.assertRaises(ET.ParseError):
+                    list(xml_utils.get_backend(name).iter_rows(io.BytesIO(broken)))
+
+    def test_analysis_identical_across_backends(self):
+        """Test analyzer findings and stats do not depend on the backend"""
+        test_file = os.path.join(self.test_files_dir, 'backends.xlsx')
+        wb = Workbook()
+        ws = wb.active
+        ws['B2'] = 'zero\u200Bwidth'
+        ws['C3'] = '=A1'
+        wb.create_sheet('S' * 40)['A1'] = 1
+        wb.save(test_file)
+        
+        results = {}
+        for name in self.backends:
+            analyzer = ExcelAnalyzer()
+            errors = analyzer.analyze_file(test_file, parser=name, collect_stats=True)
+            stats = analyzer.stats.to_dict()
+            results[name] = (errors, stats["sheets"], stats["shared_strings"])
+        expected = results['stdlib']
+        self.assertEqual(sorted(e.error_type for e in expected[0]),
+                         ["Sheet name too long", "Special character"])
+        for name, result in results.items():
+            with self.subTest(backend=name):
+                self.assertEqual(result, expected)
+
+    def test_row_ranges_parse_like_whole_sheet(self):
+        """Test row-aligned ranges parsed separately yield the sheet's rows"""
+        rows = b''.join(b'<row r="%d"><c r="A%d" t="str"><v>v%d</v></c></row>\n' % (i, i, i)
+                        for i in range(1, 101))
+        data = SHEET_XML.replace(SHEET_XML[SHEET_XML.index(b'<row'):SHEET_XML.index(b'</sheetData>')], rows)
+        start, end = xml_utils.find_sheet_data(data)
+        ranges = xml_utils.split_row_ranges(data, start, end, 7)
+        self.assertEqual(len(ranges), 7)
+        self.assertEqual((ranges[0][0], ranges[-1][1]), (start, end))
+        
+        backend = xml_utils.get_backend()
+        expected = list(backend.iter_rows(io.BytesIO(data)))
+        parsed = []
+        for range_start, _ in ranges[1:]:
+            self.assertTrue(data.startswith(b'<row', range_start))
+        for range_start, range_end in ranges:
+            stream = xml_utils.SegmentReader(data[:start], memoryview(data)[range_start:range_end],
+                                             data[end:])
+            parsed.extend(backend.iter_rows(stream))
+            stream.close()
+        self.assertEqual(parsed, expected)
+        self.assertIsNone(xml_utils.find_sheet_data(b'<worksheet><sheetData/></worksheet>'))
+
+    def test_row_sample_reader_keeps_whole_blocks(self):
+        """Test sampled row blocks still parse as a worksheet, in small reads"""
+        rows = b''.join(b'<row r="%d"><c r="A%d" t="str"><v>v%d</v></c></row>\n' % (i, i, i)
+                        for i in range(1, 101))
+        data = SHEET_XML.replace(SHEET_XML[SHEET_XML.index(b'<row'):SHEET_XML.index(b'</sheetData>')], rows)
+        for name in self.backends:
+            backend = xml_utils.get_backend(name)
+            decisions = iter([True, False] * 10)
+            reader = xml_utils.RowSampleReader(io.BytesIO(data), lambda: next(decisions), block_rows=8)
+            reader.READ_SIZE = 100
+            parsed = [row.number for row in backend.iter_rows(reader)]
+            expected = [n for n in range(1, 101) if (n - 1) // 8 % 2 == 0]
+            self.assertEqual(parsed, expected, name)
+            self.assertEqual(reader.rows_total, 100)
+        
+        # Nothing kept: only head and tail reach the parser
+        reader = xml_utils.RowSampleReader(io.BytesIO(data), lambda: False)
+        head = data[:data.index(b'<sheetData>') + len(b'<sheetData>')]
+        self.assertEqual(reader.read(), head + data[data.index(b'</sheetData>'):])
+        for empty in (b'<worksheet><sheetData/></worksheet>', b'<worksheet><sheetData /></worksheet>'):
+            reader = xml_utils.RowSampleReader(io.BytesIO(empty), lambda: True)
+            self.assertEqual(reader.read(), empty)
+            self.assertIsNone(xml_utils.find_sheet_data(empty))
+
+    def tearDown(self):
+        if os.path.exists(self.test_files_dir):
+            for file in os.listdir(self.test_files_dir):
+                os.remove(os.path.join(self.test_files_dir, file))
+            os.rmdir(self.test_files_dir)